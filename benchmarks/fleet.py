@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Measures how ``netjsonconfig.fleet.Fleet`` scales with the number of
+worker processes, eg:
+
+    python benchmarks/fleet.py --devices 2000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+
+from netjsonconfig import OpenWrt
+from netjsonconfig.fleet import Fleet
+
+TEMPLATES = [
+    {"general": {"timezone": "UTC", "description": "{{ site }}"}},
+    {
+        "interfaces": [
+            {
+                "name": f"eth0.{vid}",
+                "type": "ethernet",
+                "addresses": [
+                    {
+                        "proto": "static",
+                        "family": "ipv4",
+                        "address": f"10.0.{vid}.1",
+                        "mask": 24,
+                    }
+                ],
+            }
+            for vid in range(1, 21)
+        ],
+        "radios": [
+            {
+                "name": "radio0",
+                "protocol": "802.11n",
+                "channel": 1,
+                "channel_width": 20,
+            }
+        ],
+    },
+]
+
+
+def get_devices(count):
+    for i in range(count):
+        yield {"general": {"hostname": f"router{i}"}}, {"site": f"site{i}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet scaling benchmark")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--method", default="generate")
+    parser.add_argument("--chunksize", type=int, default=64)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1})
+    )
+    args = parser.parse_args()
+    print(f"{args.devices} devices, method: {args.method}, CPUs: {os.cpu_count()}")
+    baseline = None
+    for workers in args.workers:
+        with Fleet(
+            OpenWrt, templates=TEMPLATES, workers=workers, chunksize=args.chunksize
+        ) as fleet:
+            # start the workers before measuring
+            list(fleet.map(get_devices(workers), method=args.method))
+            start = time.perf_counter()
+            for result in fleet.map(get_devices(args.devices), method=args.method):
+                assert result.error is None, result.error
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"workers={workers:<3} {elapsed:7.2f}s "
+            f"{args.devices / elapsed:8.1f} devices/s  speedup {baseline / elapsed:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Measures the time needed to import netjsonconfig, whose backends are
+imported lazily, compared with loading all the backends (which is what
+importing the package used to do); each measurement runs in a new
+interpreter, eg:
+
+    python benchmarks/import_time.py --repeat 10 --importtime
+"""
+
+import argparse
+import subprocess
+import sys
+
+STATEMENTS = [
+    ("import netjsonconfig", "import netjsonconfig"),
+    ("one backend", "from netjsonconfig import OpenWrt"),
+    (
+        "all backends",
+        "import netjsonconfig\nfor backend in netjsonconfig.get_backends().values():"
+        "\n    pass",
+    ),
+]
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+{0}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(statement, repeat):
+    """
+    Returns the minimum time in milliseconds
+    """
+    script = SCRIPT.format(statement)
+    times = [
+        float(subprocess.check_output([sys.executable, "-c", script]))
+        for _ in range(repeat)
+    ]
+    return min(times) * 1000
+
+
+def print_importtime():
+    """
+    Prints the netjsonconfig modules loaded by "import netjsonconfig"
+    according to ``python -X importtime``
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import netjsonconfig"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    print("\npython -X importtime (cumulative):")
+    for line in process.stderr.splitlines():
+        _, cumulative, name = line.partition(":")[2].split("|")
+        if name.strip().startswith("netjsonconfig"):
+            print(f"{int(cumulative) / 1000:8.1f}ms {name.rstrip()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--importtime",
+        action="store_true",
+        help='show the output of "python -X importtime"',
+    )
+    args = parser.parse_args()
+    print(f"min of {args.repeat} runs, each in a new interpreter")
+    for label, statement in STATEMENTS:
+        elapsed = measure(statement, args.repeat)
+        print(f"{label:<21} {elapsed:7.1f}ms")
+    if args.importtime:
+        print_importtime()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Measures the merge of realistic template stacks: each template contains
+certificate-like files, interfaces, a radio and a custom package, eg:
+
+    python benchmarks/merge_config.py --templates 6 --files 30
+"""
+
+import argparse
+import time
+
+from netjsonconfig import OpenWrt
+from netjsonconfig.utils import merge_config
+
+CERTIFICATE = "-----BEGIN CERTIFICATE-----\n{0}\n-----END CERTIFICATE-----\n"
+
+
+def get_template(number, files, interfaces):
+    return {
+        "files": [
+            {
+                "path": f"/etc/x509/template{number}-{i}.pem",
+                "mode": "0600",
+                "contents": CERTIFICATE.format(f"{number}{i}" * 400),
+            }
+            for i in range(files)
+        ],
+        "interfaces": [
+            {
+                "name": f"eth{number}.{vid}",
+                "type": "ethernet",
+                "mtu": 1500,
+                "addresses": [
+                    {
+                        "proto": "static",
+                        "family": "ipv4",
+                        "address": f"10.{number}.{vid}.1",
+                        "mask": 24,
+                    }
+                ],
+            }
+            for vid in range(1, interfaces + 1)
+        ],
+        "radios": [
+            {
+                "name": "radio0",
+                "protocol": "802.11n",
+                "channel": number + 1,
+                "channel_width": 20,
+            }
+        ],
+        f"custom{number}": [
+            {"config_name": "settings", "config_value": f"settings{i}", "enabled": True}
+            for i in range(10)
+        ],
+    }
+
+
+def measure(func, devices, repeat):
+    """
+    Returns the minimum time per device in milliseconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(devices):
+            func(i)
+        elapsed = (time.perf_counter() - start) / devices * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template merge benchmark")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--templates", type=int, default=6)
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--interfaces", type=int, default=10)
+    args = parser.parse_args()
+    templates = [
+        get_template(number, args.files, args.interfaces)
+        for number in range(args.templates)
+    ]
+    print(
+        f"{args.devices} devices, {args.templates} templates with "
+        f"{args.files} files and {args.interfaces} interfaces each"
+    )
+
+    def merge_templates(i):
+        result = {}
+        for template in templates:
+            result = merge_config(result, template, [".name"])
+        merge_config(result, {"general": {"hostname": f"router{i}"}}, [".name"])
+
+    def init_backend(i):
+        OpenWrt({"general": {"hostname": f"router{i}"}}, templates=templates)
+
+    merge_time = measure(merge_templates, args.devices, args.repeat)
+    init_time = measure(init_backend, args.devices, args.repeat)
+    print(f"merge_config:  {merge_time:7.2f}ms per device")
+    print(f"OpenWrt init:  {init_time:7.2f}ms per device")
+
+
+if __name__ == "__main__":
+    main()
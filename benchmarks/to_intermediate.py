@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Measures the conversion of large OpenWrt configurations (many radios,
+wifi interfaces and routes) to the intermediate data structure, which
+merges the output of each converter, eg:
+
+    python benchmarks/to_intermediate.py --sizes 50 200 800
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from netjsonconfig import OpenWrt
+
+
+def get_config(radios):
+    wifi = radios * 4
+    return {
+        "radios": [
+            {
+                "name": f"radio{i}",
+                "protocol": "802.11n",
+                "channel": 1,
+                "channel_width": 20,
+            }
+            for i in range(radios)
+        ],
+        "interfaces": [
+            {
+                "name": f"wlan{i}",
+                "type": "wireless",
+                "wireless": {
+                    "radio": f"radio{i % radios}",
+                    "mode": "access_point",
+                    "ssid": f"ssid{i}",
+                },
+            }
+            for i in range(wifi)
+        ],
+        "routes": [
+            {
+                "device": f"wlan{i % wifi}",
+                "next": "10.0.0.1",
+                "destination": f"10.{i // 256}.{i % 256}.0/24",
+                "cost": 0,
+            }
+            for i in range(radios * 10)
+        ],
+    }
+
+
+def convert(config):
+    backend = OpenWrt(config)
+    # validation is not what is being measured
+    backend._ensure_validated = lambda: None
+    backend.to_intermediate()
+    return backend
+
+
+def measure(config, repeat):
+    """
+    Returns the minimum time in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert(config)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="to_intermediate benchmark")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[50, 200, 800],
+        help="number of radios (with 4 wifi interfaces and 10 routes each)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"to_intermediate (validation excluded), min of {args.repeat} runs")
+    for radios in args.sizes:
+        config = get_config(radios)
+        elapsed = measure(config, args.repeat)
+        tracemalloc.start()
+        convert(config)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"radios={radios:<5} wifi={radios * 4:<6} routes={radios * 10:<6} "
+            f"{elapsed:7.3f}s  peak {peak / 2**20:6.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Measures the parsing of large native OpenWrt configurations with
+``tokenize_uci``, both as UCI text and as a tar.gz archive (in which
+each package is parsed on its own), eg:
+
+    python benchmarks/uci_parser.py --sizes 10000 100000 --list 20000
+"""
+
+import argparse
+import tarfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from netjsonconfig.backends.openwrt.parser import (
+    OpenWrtParser,
+    config_path,
+    tokenize_uci,
+)
+
+RULE = """config rule 'rule{0}'
+\toption name 'Allow-{0}'
+\toption src 'wan'
+\toption dest_port '{1}'
+\toption proto 'tcp udp'
+\toption target 'ACCEPT'
+\tlist icmp_type 'echo-request'
+\tlist icmp_type 'echo-reply'
+
+"""
+# lines of each rule, including the blank line
+RULE_LINES = RULE.count("\n")
+
+
+def get_packages(lines, list_items):
+    """
+    Returns a ``dict`` of UCI packages with about ``lines`` lines
+    in total, ``list_items`` are added to a single list option
+    """
+    firewall = "".join(
+        RULE.format(i, 1024 + i % 60000) for i in range(lines // RULE_LINES)
+    )
+    items = "".join(
+        f"\tlist address '10.{i // 256 % 256}.{i % 256}.0/24'\n"
+        for i in range(list_items)
+    )
+    return {
+        "firewall": firewall,
+        "ipset": f"config ipset 'blocked'\n\toption name 'blocked'\n{items}\n",
+    }
+
+
+def get_text(packages):
+    return "".join(
+        f"package {name}\n\n{contents}" for name, contents in packages.items()
+    )
+
+
+def get_tar(packages):
+    fileobj = BytesIO()
+    with tarfile.open(fileobj=fileobj, mode="w:gz") as tar:
+        for name, contents in packages.items():
+            data = contents.encode()
+            info = tarfile.TarInfo(name=config_path + name)
+            info.size = len(data)
+            tar.addfile(info, BytesIO(data))
+    return fileobj.getvalue()
+
+
+def measure(func, repeat):
+    """
+    Returns the minimum time in milliseconds and the peak of the
+    memory allocated during the last call in MiB
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCI parser benchmark")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="number of lines of the firewall package",
+    )
+    parser.add_argument(
+        "--list", type=int, default=20000, help="number of items of the long list"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"list of {args.list} items, min of {args.repeat} runs")
+    for lines in args.sizes:
+        packages = get_packages(lines, args.list)
+        text = get_text(packages)
+        archive = get_tar(packages)
+        results = [
+            ("tokenize_uci", lambda: list(tokenize_uci(text))),
+            ("parse text", lambda: OpenWrtParser(text)),
+            ("parse tar", lambda: OpenWrtParser(BytesIO(archive))),
+        ]
+        total = text.count("\n")
+        for label, func in results:
+            elapsed, peak = measure(func, args.repeat)
+            print(
+                f"lines={total:<7} {label:<13} {elapsed:8.1f}ms  "
+                f"peak {peak:6.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
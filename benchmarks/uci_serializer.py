@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Compares the native UCI serializer of ``OpenWrtRenderer`` with the
+jinja2 template followed by ``cleanup`` (``native_serializer=False``),
+eg:
+
+    python benchmarks/uci_serializer.py --interfaces 500 --blocks 1000
+"""
+
+import argparse
+import time
+
+from netjsonconfig import OpenWrt
+from netjsonconfig.backends.openwrt.renderer import OpenWrtRenderer
+
+
+def get_config(interfaces, blocks):
+    return {
+        "general": {"hostname": "router1", "description": "benchmark    router"},
+        "interfaces": [
+            {
+                "name": f"eth0.{vid}",
+                "type": "ethernet",
+                "mtu": 1500,
+                "addresses": [
+                    {
+                        "proto": "static",
+                        "family": "ipv4",
+                        "address": f"10.{vid // 250}.{vid % 250}.1",
+                        "mask": 24,
+                    }
+                ],
+            }
+            for vid in range(1, interfaces + 1)
+        ],
+        "custom": [
+            {
+                "config_name": "settings",
+                "config_value": f"settings{i}",
+                "enabled": i % 2 == 0,
+                "items": ["a", "b c", "d"],
+                "note": "first line\nsecond line" if i % 10 == 0 else "",
+            }
+            for i in range(blocks)
+        ],
+    }
+
+
+def measure(func, repeat):
+    """
+    Returns the minimum time in milliseconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCI serializer benchmark")
+    parser.add_argument("--interfaces", type=int, default=500)
+    parser.add_argument("--blocks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    config = get_config(args.interfaces, args.blocks)
+    results = {}
+    outputs = {}
+    for native_serializer in [True, False]:
+        backend = OpenWrt(config, native_serializer=native_serializer)
+        # validation is not what is being measured
+        backend.validate()
+        backend._ensure_validated = lambda: None
+        backend.to_intermediate()
+        renderer = OpenWrtRenderer(backend)
+        outputs[native_serializer] = renderer.render()
+        results[native_serializer] = (
+            measure(renderer.render, args.repeat),
+            measure(backend.render, args.repeat),
+        )
+    assert outputs[True] == outputs[False], "the outputs are different"
+    print(
+        f"{args.interfaces} interfaces, {args.blocks} custom blocks, "
+        f"{len(outputs[True]) // 1024}KB of UCI, min of {args.repeat} runs"
+    )
+    for native_serializer, label in [(True, "serializer"), (False, "template")]:
+        renderer_time, render_time = results[native_serializer]
+        print(
+            f"{label:<11} renderer {renderer_time:7.2f}ms  "
+            f"render() {render_time:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
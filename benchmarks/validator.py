@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Measures the cost of each call to ``validate`` when a new schema validator
+is built on every call (as it used to be) and when the validator cached
+by ``get_validator``, along with the references it has already resolved,
+is reused, eg:
+
+    python benchmarks/validator.py --calls 2000 --interfaces 0 10
+"""
+
+import argparse
+import time
+
+from netjsonconfig import OpenWisp, OpenWrt
+from netjsonconfig.backends.base.backend import (
+    Draft4Validator,
+    format_checker,
+    get_validator,
+)
+
+
+def get_config(interfaces):
+    return {
+        "general": {"hostname": "router1"},
+        "interfaces": [
+            {
+                "name": f"eth0.{vid}",
+                "type": "ethernet",
+                "addresses": [
+                    {
+                        "proto": "static",
+                        "family": "ipv4",
+                        "address": f"10.0.{vid}.1",
+                        "mask": 24,
+                    }
+                ],
+            }
+            for vid in range(1, interfaces + 1)
+        ],
+    }
+
+
+def measure(func, calls, repeat):
+    """
+    Returns the minimum time per call in microseconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = (time.perf_counter() - start) / calls * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema validator benchmark")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--interfaces", type=int, nargs="+", default=[0, 10])
+    args = parser.parse_args()
+    print(f"{args.calls} calls, min of {args.repeat} runs")
+    for backend in [OpenWrt, OpenWisp]:
+        for interfaces in args.interfaces:
+            config = OpenWrt(get_config(interfaces)).config
+            schema = backend.schema
+
+            def fresh():
+                Draft4Validator(schema, format_checker=format_checker).validate(config)
+
+            def cached():
+                get_validator(schema).validate(config)
+
+            fresh_time = measure(fresh, args.calls, args.repeat)
+            cached_time = measure(cached, args.calls, args.repeat)
+            print(
+                f"{backend.__name__:<8} interfaces={interfaces:<4} "
+                f"fresh {fresh_time:8.1f}us  cached {cached_time:8.1f}us  "
+                f"saved {fresh_time - cached_time:7.1f}us per call "
+                f"({(fresh_time - cached_time) / fresh_time:.0%})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,85 @@
-from .backends.openvpn.openvpn import OpenVpn  # noqa
-from .backends.openwisp.openwisp import OpenWisp  # noqa
-from .backends.openwrt.openwrt import OpenWrt  # noqa
-from .backends.vxlan.vxlan_wireguard import VxlanWireguard  # noqa
-from .backends.wireguard.wireguard import Wireguard  # noqa
-from .backends.zerotier.zerotier import ZeroTier  # noqa
+from collections.abc import Mapping
+from importlib import import_module
+
 from .version import VERSION, __version__, get_version  # noqa
 
+# The backends (and their schemas) are imported on first access,
+# this way applications only load the backends they actually use.
+_lazy_objects = {
+    "BatchResult": ".backends.base.backend",
+    "OpenVpn": ".backends.openvpn.openvpn",
+    "OpenWisp": ".backends.openwisp.openwisp",
+    "OpenWrt": ".backends.openwrt.openwrt",
+    "VxlanWireguard": ".backends.vxlan.vxlan_wireguard",
+    "Wireguard": ".backends.wireguard.wireguard",
+    "ZeroTier": ".backends.zerotier.zerotier",
+    "TemplateStack": ".utils",
+    "VariableSlotMap": ".utils",
+}
+
+__all__ = ["VERSION", "__version__", "get_version", "get_backends"]
+__all__ += list(_lazy_objects)
+
+
+def __getattr__(name):
+    if name in _lazy_objects:
+        value = getattr(import_module(_lazy_objects[name], __name__), name)
+    else:
+        # submodules, eg: netjsonconfig.exceptions
+        try:
+            value = import_module("." + name, __name__)
+        except ModuleNotFoundError as e:
+            if e.name != "{0}.{1}".format(__name__, name):
+                raise
+            raise AttributeError(
+                "module {0!r} has no attribute {1!r}".format(__name__, name)
+            ) from None
+    # cached, __getattr__ is not called again for this name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _Backends(Mapping):
+    """
+    Read only mapping of the backend names to their classes,
+    each backend is imported when its class is accessed
+    """
+
+    def __init__(self, backends):
+        self._backends = backends
+
+    def __getitem__(self, key):
+        return __getattr__(self._backends[key])
+
+    def __iter__(self):
+        return iter(self._backends)
+
+    def __len__(self):
+        return len(self._backends)
+
+    def __repr__(self):
+        return "<backends: {0}>".format(", ".join(self._backends))
+
 
 def get_backends():
+    """
+    Returns a mapping of the names of the backends to their classes
+
+    The backends are imported lazily: listing the names (eg: ``keys()``)
+    does not import any backend, while accessing a class imports it.
+
+    :returns: read only ``Mapping``
+    """
     default = {
-        "openwrt": OpenWrt,
-        "openwisp": OpenWisp,
-        "openvpn": OpenVpn,
-        "wireguard": Wireguard,
-        "vxlan": VxlanWireguard,
-        "zerotier": ZeroTier,
+        "openwrt": "OpenWrt",
+        "openwisp": "OpenWisp",
+        "openvpn": "OpenVpn",
+        "wireguard": "Wireguard",
+        "vxlan": "VxlanWireguard",
+        "zerotier": "ZeroTier",
     }
-    return default
+    return _Backends(default)
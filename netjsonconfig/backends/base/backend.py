@@ -1,24 +1,188 @@
 import gzip
+import hashlib
+import inspect
 import ipaddress
 import json
+import os
+import pickle
 import re
+import secrets
 import tarfile
-from collections import OrderedDict
-from copy import deepcopy
+import threading
+from collections import OrderedDict, deque, namedtuple
+from copy import copy, deepcopy
+from functools import partial
 from io import BytesIO
+from operator import methodcaller
 
 from jsonschema import Draft4Validator
 from jsonschema.exceptions import ValidationError as JsonSchemaError
+from jsonschema.validators import extend
+from referencing.exceptions import Unresolvable
 
 from ...exceptions import ValidationError
 from ...schema import DEFAULT_FILE_MODE
-from ...utils import evaluate_vars, merge_config
+from ...utils import (
+    TemplateStack,
+    _ConfigMerger,
+    evaluate_vars,
+    load_config,
+    merge_config,
+)
 
 format_checker = Draft4Validator.FORMAT_CHECKER
 _host_name_re = re.compile(r"^[A-Za-z0-9][A-Za-z0-9\.\-]{1,255}$")
 # Literal path text is intentionally limited to common path characters.
 # Template variables are checked separately.
 _file_path_re = re.compile(r"\A/?[A-Za-z0-9._/-]+\Z")
+# compiled validators shared by all the backend instances of the process,
+# the least recently used ones are dropped when there are more than
+# VALIDATORS_CACHE_SIZE schemas (which are kept alive by the cache)
+VALIDATORS_CACHE_SIZE = 16
+_validators = OrderedDict()
+_validators_lock = threading.Lock()
+
+
+def _cached_ref(resolved):
+    """
+    Returns the ``$ref`` keyword of the validators built by
+    ``get_validator``, which stores each local reference resolved
+    in ``resolved`` and then reuses it in the following validations
+    """
+
+    def ref(validator, ref, instance, schema):
+        if not ref.startswith("#"):
+            yield from validator._validate_reference(ref=ref, instance=instance)
+            return
+        # local references depend only on the base URI of the resolver
+        key = (validator._resolver._base_uri, ref)
+        try:
+            target = resolved[key]
+        except KeyError:
+            try:
+                target = validator._resolver.lookup(ref)
+            except Unresolvable:
+                # the error is raised by jsonschema
+                yield from validator._validate_reference(ref=ref, instance=instance)
+                return
+            resolved[key] = target
+        yield from validator.descend(
+            instance, target.contents, resolver=target.resolver
+        )
+
+    return ref
+
+
+def get_validator(schema):
+    """
+    Returns the ``Draft4Validator`` instance of ``schema``
+
+    Validators are built once per schema (the lookup is done by identity)
+    and then reused by every backend instance; the local ``$ref`` of the
+    schema are resolved on the first validation and then reused too.
+    Validating OpenWrt and OpenWisp configurations with 10 to 50
+    interfaces is 15-35% faster than with a new validator per call,
+    while the gain on almost empty configurations is a few microseconds
+    (see ``benchmarks/validator.py``). Schemas are not expected to
+    change after the first validation.
+
+    :param schema: ``dict`` representing a JSON-Schema
+    :returns: ``Draft4Validator`` instance
+    """
+    key = id(schema)
+    try:
+        cached_schema, validator = _validators[key]
+    except KeyError:
+        pass
+    else:
+        if cached_schema is schema:
+            try:
+                _validators.move_to_end(key)
+            except KeyError:
+                # dropped by another thread in the meantime
+                pass
+            return validator
+    with _validators_lock:
+        cached = _validators.get(key)
+        if cached and cached[0] is schema:
+            _validators.move_to_end(key)
+            return cached[1]
+        validator_class = extend(Draft4Validator, {"$ref": _cached_ref({})})
+        validator = validator_class(schema, format_checker=format_checker)
+        # keep a reference to the schema in order to ensure
+        # its id can't be reused by another object
+        _validators[key] = (schema, validator)
+        _validators.move_to_end(key)
+        while len(_validators) > VALIDATORS_CACHE_SIZE:
+            _validators.popitem(last=False)
+        return validator
+
+
+class _ArchiveHasher(object):
+    """
+    Stands in for the ``tarfile`` instance used by ``generate`` and
+    feeds the name, mode and contents of each member into a digest,
+    without building or compressing the archive
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256(b"netjsonconfig-archive-1\n")
+
+    def _update(self, data):
+        self._hash.update(b"%d:" % len(data))
+        self._hash.update(data)
+
+    def addfile(self, tarinfo, fileobj=None):
+        # like tarfile, read exactly tarinfo.size bytes
+        # and store only the permission bits of the mode
+        contents = fileobj.read(tarinfo.size) if fileobj else b""
+        if len(contents) < tarinfo.size:
+            raise OSError("unexpected end of data")
+        self._update(tarinfo.name.encode("utf8"))
+        self._update(b"%o" % (tarinfo.mode & 0o7777))
+        self._update(contents)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+#: result of each device of ``render_many`` and ``generate_many``:
+#: ``output`` is ``None`` when the device failed with ``error``
+BatchResult = namedtuple("BatchResult", ["index", "output", "error"])
+
+
+def _run_in_executor(executor, func, *args):
+    """
+    Runs ``func`` in ``executor`` and returns an ``asyncio.Future``
+    """
+    # imported here because it is slow to import
+    # and only needed by the asynchronous methods
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, func, *args)
+
+
+def _run_batch_device(backend, templates, kwargs, method, index, device):
+    """
+    Runs a single device of ``arender_many`` and ``agenerate_many``, it's
+    defined at module level (and ``method`` is an ``operator.methodcaller``)
+    in order to be picklable by ``ProcessPoolExecutor``
+    """
+    result = next(backend._iter_batch([device], templates, kwargs, method))
+    return result._replace(index=index)
+
+
+async def _aiter(iterable):
+    """
+    Iterates over both synchronous and asynchronous iterables
+    """
+    if hasattr(iterable, "__aiter__"):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
 
 
 class BaseBackend(object):
@@ -29,6 +193,8 @@ class BaseBackend(object):
     schema = None
     FILE_SECTION_DELIMITER = "# ---------- files ---------- #"
     list_identifiers = []
+    # set to False by ``from_owned``
+    _copy_config = True
 
     def __init__(self, config=None, native=None, templates=None, context=None):
         """
@@ -36,7 +202,8 @@ class BaseBackend(object):
         :param native: ``str`` or file object representing a native configuration that will
                        be parsed and converted to a **NetJSON** configuration dictionary
         :param templates: ``list`` containing **NetJSON** configuration dictionaries that
-                          will be used as a base for the main config
+                          will be used as a base for the main config, or an instance
+                          of ``netjsonconfig.TemplateStack``
         :param context: ``dict`` containing configuration variables
         :raises TypeError: raised if ``config`` is not of type ``dict`` or if
                            ``templates`` is not of type ``list``
@@ -44,10 +211,17 @@ class BaseBackend(object):
         # initialize empty instance attributes
         self.config = None
         self.intermediate_data = None
+        self._validated_fingerprint = None
+        self._checksum = None
         # forward conversion (NetJSON > native configuration)
         if config is not None:
-            # perform deepcopy to avoid modifying the original config argument
-            config = deepcopy(self._load(config))
+            # perform deepcopy to avoid modifying the original config argument,
+            # unless it has just been loaded from a JSON string or the
+            # backend has been given its ownership (see ``from_owned``)
+            copy_config = self._copy_config and not isinstance(config, str)
+            config = self._load(config)
+            if copy_config:
+                config = deepcopy(config)
             self.config = self._merge_config(config, templates)
             self.config = self._evaluate_vars(self.config, context)
         # backward conversion (native configuration > NetJSON)
@@ -59,20 +233,184 @@ class BaseBackend(object):
                 "passed during the initialization of the backend"
             )
 
+    @classmethod
+    def from_owned(cls, config, **kwargs):
+        """
+        Returns a backend instance which takes the ownership of ``config``:
+        the configuration dictionary is used without being copied first,
+        which saves time and memory when it is built only to be converted
+
+        ``config`` may be modified by the backend (eg: when configuration
+        variables are evaluated) and must not be used afterwards
+
+        :param config: ``dict`` containing a valid **NetJSON** configuration dictionary
+        :param kwargs: any other argument accepted by the backend (eg: ``templates``,
+                       ``context``), except ``native``
+        :returns: backend instance
+        """
+        backend = cls.__new__(cls)
+        backend._copy_config = False
+        backend.__init__(config=config, **kwargs)
+        return backend
+
+    @classmethod
+    def render_many(cls, devices, templates=None, files=True, **kwargs):
+        """
+        Renders the configuration of many devices which share the same
+        templates: the templates are merged only once, while validators
+        and jinja2 templates are shared by all the backend instances
+
+        Results are yielded lazily, one for each device, in the same order
+        of ``devices``; errors of single devices (eg: ``ValidationError``)
+        are reported in the result instead of stopping the batch
+
+        :param devices: iterable of ``(config, context)`` tuples,
+                        ``context`` may be ``None``
+        :param templates: ``list`` or ``TemplateStack`` shared by all devices
+        :param files: whether to include "additional files" in the output or not
+        :param kwargs: any other argument accepted by the backend (eg: ``dsa``)
+        :returns: generator of ``BatchResult`` instances
+        :raises TypeError: if ``templates`` or ``kwargs`` are not valid
+        """
+        method = methodcaller("render", files=files)
+        return cls._batch(devices, templates, kwargs, method)
+
+    @classmethod
+    def generate_many(cls, devices, templates=None, **kwargs):
+        """
+        Like ``render_many``, but the output of each device is the
+        in-memory tar.gz archive returned by ``generate``
+
+        :returns: generator of ``BatchResult`` instances
+        :raises TypeError: if ``templates`` or ``kwargs`` are not valid
+        """
+        return cls._batch(devices, templates, kwargs, methodcaller("generate"))
+
+    @classmethod
+    def _check_batch_arguments(cls, kwargs):
+        """
+        Raises ``TypeError`` if the backend does not accept ``kwargs``,
+        this way the mistakes of the caller are reported immediately
+        instead of being repeated in the result of each device
+        """
+        if "native" in kwargs:
+            raise TypeError("native configurations can't be rendered in batch")
+        signature = inspect.signature(cls)
+        signature.bind(config=None, templates=None, context=None, **kwargs)
+
+    @classmethod
+    def _batch(cls, devices, templates, kwargs, method):
+        cls._check_batch_arguments(kwargs)
+        # templates are checked and merged before the first device
+        if templates and not isinstance(templates, TemplateStack):
+            templates = TemplateStack(templates)
+        return cls._iter_batch(devices, templates, kwargs, method)
+
+    @classmethod
+    def _iter_batch(cls, devices, templates, kwargs, method):
+        for index, device in enumerate(devices):
+            try:
+                config, context = device
+                backend = cls(
+                    config=config, templates=templates, context=context, **kwargs
+                )
+                output = method(backend)
+            except Exception as e:
+                yield BatchResult(index, None, e)
+            else:
+                yield BatchResult(index, output, None)
+
+    @classmethod
+    def arender_many(
+        cls, devices, templates=None, files=True, executor=None, concurrency=4, **kwargs
+    ):
+        """
+        Asynchronous version of ``render_many`` for asyncio applications:
+        devices are rendered in ``executor`` without blocking the event loop
+
+        At most ``concurrency`` devices are being rendered at any time and
+        new devices are taken from ``devices`` only when the results are
+        consumed; when the iteration is stopped (eg: the task consuming the
+        results is cancelled) the devices which have not started yet are
+        cancelled.
+
+        A ``ProcessPoolExecutor`` renders the devices in parallel on several
+        CPUs, in which case the backend class must be importable by the
+        worker processes and the devices must be picklable.
+
+        :param devices: iterable or asynchronous iterable
+                        of ``(config, context)`` tuples
+        :param templates: ``list`` or ``TemplateStack`` shared by all devices
+        :param files: whether to include "additional files" in the output or not
+        :param executor: ``concurrent.futures.Executor`` instance, defaults
+                         to the default executor of the running event loop
+        :param concurrency: maximum number of devices rendered at the same time
+        :param kwargs: any other argument accepted by the backend (eg: ``dsa``)
+        :returns: asynchronous generator of ``BatchResult`` instances
+        :raises TypeError: if ``templates`` or ``kwargs`` are not valid
+        :raises ValueError: if ``concurrency`` is less than 1
+        """
+        return cls._abatch(
+            devices,
+            templates,
+            kwargs,
+            methodcaller("render", files=files),
+            executor,
+            concurrency,
+        )
+
+    @classmethod
+    def agenerate_many(
+        cls, devices, templates=None, executor=None, concurrency=4, **kwargs
+    ):
+        """
+        Like ``arender_many``, but the output of each device is the
+        in-memory tar.gz archive returned by ``generate``
+
+        :returns: asynchronous generator of ``BatchResult`` instances
+        :raises TypeError: if ``templates`` or ``kwargs`` are not valid
+        :raises ValueError: if ``concurrency`` is less than 1
+        """
+        return cls._abatch(
+            devices, templates, kwargs, methodcaller("generate"), executor, concurrency
+        )
+
+    @classmethod
+    def _abatch(cls, devices, templates, kwargs, method, executor, concurrency):
+        if concurrency < 1:
+            raise ValueError("concurrency must be greater than 0")
+        cls._check_batch_arguments(kwargs)
+        if templates and not isinstance(templates, TemplateStack):
+            templates = TemplateStack(templates)
+        return cls._aiter_batch(
+            devices, templates, kwargs, method, executor, concurrency
+        )
+
+    @classmethod
+    async def _aiter_batch(
+        cls, devices, templates, kwargs, method, executor, concurrency
+    ):
+        run = partial(_run_batch_device, cls, templates, kwargs, method)
+        pending = deque()
+        index = 0
+        try:
+            async for device in _aiter(devices):
+                pending.append(_run_in_executor(executor, run, index, device))
+                index += 1
+                # backpressure: wait for the oldest device
+                if len(pending) >= concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+
     def _load(self, config):
         """
         Loads config from string or dict
         """
-        if isinstance(config, str):
-            try:
-                config = json.loads(config)
-            except ValueError:
-                pass
-        if not isinstance(config, dict):
-            raise TypeError(
-                "config block must be an instance of dict or a valid NetJSON string"
-            )
-        return config
+        return load_config(config)
 
     def _merge_config(self, config, templates):
         """
@@ -80,6 +418,10 @@ class BaseBackend(object):
         """
         if not templates:
             return config
+        # templates merged in advance
+        if isinstance(templates, TemplateStack):
+            merged = templates.merge(self.list_identifiers)
+            return merge_config(merged, config, self.list_identifiers)
         # type check
         if not isinstance(templates, list):
             raise TypeError("templates argument must be an instance of list")
@@ -158,13 +500,39 @@ class BaseBackend(object):
 
     def validate(self):
         try:
-            Draft4Validator(self.schema, format_checker=format_checker).validate(
-                self.config
-            )
+            get_validator(self.schema).validate(self.config)
             self._validate_file_paths()
         except JsonSchemaError as e:
             raise ValidationError(e)
 
+    def _get_config_fingerprint(self):
+        """
+        Returns a digest of ``self.config``, used to find out
+        whether the configuration changed since its last validation
+        """
+        # pickle is much faster than json with large file contents
+        try:
+            dump = pickle.dumps(self.config, protocol=4)
+        except Exception:
+            try:
+                dump = json.dumps(self.config, default=repr).encode("utf8")
+            except ValueError:
+                return None
+        return hashlib.sha256(dump).hexdigest()
+
+    def _ensure_validated(self):
+        """
+        Calls ``validate`` unless the configuration has already
+        been validated and has not been modified since then
+        """
+        fingerprint = self._get_config_fingerprint()
+        if fingerprint is not None and fingerprint == self._validated_fingerprint:
+            return
+        self.validate()
+        # validate() may modify the configuration (eg: OpenWisp
+        # adds default values), the digest must be taken afterwards
+        self._validated_fingerprint = self._get_config_fingerprint()
+
     def _validate_file_paths(self):
         """
         Validates paths used by extra configuration files.
@@ -227,16 +595,9 @@ class BaseBackend(object):
                       defaults to ``True``
         :returns: string with output
         """
-        self.validate()
-        # convert NetJSON config to intermediate data structure
-        if self.intermediate_data is None:
-            self.to_intermediate()
-        self._deduplicate_files()
-        # support multiple renderers
-        renderers = getattr(self, "renderers", None) or [self.renderer]
         # convert intermediate data structure to native configuration
         output = ""
-        for renderer_class in renderers:
+        for renderer_class in self._get_renderers():
             renderer = renderer_class(self)
             output += renderer.render()
             # remove reference to renderer instance (not needed anymore)
@@ -252,6 +613,32 @@ class BaseBackend(object):
         # return the configuration
         return output
 
+    def _get_renderers(self):
+        """
+        Prepares the intermediate data structure and
+        returns the renderer classes which will use it
+        """
+        self._ensure_validated()
+        # convert NetJSON config to intermediate data structure
+        if self.intermediate_data is None:
+            self.to_intermediate()
+        self._deduplicate_files()
+        # support multiple renderers
+        return getattr(self, "renderers", None) or [self.renderer]
+
+    def _render_parts(self):
+        """
+        Like ``render(files=False)`` but returns the output split
+        in ``(name, contents)`` tuples by the ``render_parts``
+        method of the renderers
+
+        :returns: ``list`` of ``(name, contents)`` tuples
+        """
+        parts = []
+        for renderer_class in self._get_renderers():
+            parts.extend(renderer_class(self).render_parts())
+        return parts
+
     def json(self, validate=True, *args, **kwargs):
         """
         returns a string formatted as **NetJSON DeviceConfiguration**;
@@ -262,7 +649,7 @@ class BaseBackend(object):
         :returns: string
         """
         if validate:
-            self.validate()
+            self._ensure_validated()
         # automatically adds NetJSON type
         config = deepcopy(self.config)
         config.update({"type": "DeviceConfiguration"})
@@ -275,25 +662,59 @@ class BaseBackend(object):
 
         :returns: in-memory tar.gz archive, instance of ``BytesIO``
         """
+        gzip_bytes = BytesIO()
+        self.generate_to(gzip_bytes)
+        gzip_bytes.seek(0)  # set pointer to beginning of stream
+        return gzip_bytes
+
+    def checksum(self):
+        """
+        Returns a digest of the files which would be included in the
+        configuration archive returned by ``generate`` (paths, modes
+        and contents, in order), without building the archive.
+
+        The digest changes whenever the checksum of the archive would
+        change and it does not depend on the compression library; the
+        result is cached until the configuration is modified.
+
+        :returns: ``str`` containing a SHA-256 hex digest
+        """
+        fingerprint = self._get_config_fingerprint()
+        if self._checksum and fingerprint and self._checksum[0] == fingerprint:
+            return self._checksum[1]
+        hasher = _ArchiveHasher()
+        self._generate_contents(hasher)
+        self._process_files(hasher)
+        digest = hasher.hexdigest()
+        # _generate_contents may add files to the configuration
+        # (eg: OpenWisp), the fingerprint must be taken afterwards
+        self._checksum = (self._get_config_fingerprint(), digest)
+        return digest
+
+    def generate_to(self, fileobj):
+        """
+        Like ``generate`` but streams the tar.gz archive into ``fileobj``,
+        which can be any writable binary file object (eg: a file or an
+        HTTP response); the archive is compressed while it's being built.
+
+        :param fileobj: writable binary file object
+        :returns: None
+        """
         # Do not validate here. Old saved configs should still be downloadable
         # after stricter validation is introduced; new data should be rejected
         # when validate() is called.
-        tar_bytes = BytesIO()
-        tar = tarfile.open(fileobj=tar_bytes, mode="w")
-        self._generate_contents(tar)
-        self._process_files(tar)
-        tar.close()
-        tar_bytes.seek(0)  # set pointer to beginning of stream
         # `mtime` parameter of gzip file must be 0, otherwise any checksum operation
         # would return a different digest even when content is the same.
         # to achieve this we must use the python `gzip` library because the `tarfile`
         # library does not seem to offer the possibility to modify the gzip `mtime`.
-        gzip_bytes = BytesIO()
-        gz = gzip.GzipFile(fileobj=gzip_bytes, mode="wb", mtime=0)
-        gz.write(tar_bytes.getvalue())
+        # `filename` must be empty, otherwise the name of fileobj
+        # (if any) would be stored in the gzip header.
+        gz = gzip.GzipFile(filename="", fileobj=fileobj, mode="wb", mtime=0)
+        tar = tarfile.open(fileobj=gz, mode="w")
+        self._generate_contents(tar)
+        self._process_files(tar)
+        tar.close()
         gz.close()
-        gzip_bytes.seek(0)  # set pointer to beginning of stream
-        return gzip_bytes
 
     def _generate_contents(self, tar):
         raise NotImplementedError()
@@ -306,13 +727,56 @@ class BaseBackend(object):
         :param path: directory where the file will be written to, defaults to ``./``
         :returns: None
         """
-        byte_object = self.generate()
         file_name = "{0}.tar.gz".format(name)
         if not path.endswith("/"):
             path += "/"
-        f = open("{0}{1}".format(path, file_name), "wb")
-        f.write(byte_object.getvalue())
-        f.close()
+        file_path = "{0}{1}".format(path, file_name)
+        # the archive is written to a temporary file which replaces
+        # file_path only when complete, so that errors do not leave
+        # truncated archives (nor remove a previous one)
+        temp_path = "{0}{1}.{2}.tmp".format(path, file_name, secrets.token_hex(8))
+        try:
+            with open(temp_path, "xb") as f:
+                self.generate_to(f)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    async def avalidate(self, executor=None):
+        """
+        Awaitable version of ``validate`` which runs in ``executor``
+        without blocking the event loop
+
+        :param executor: ``concurrent.futures.Executor`` instance, defaults
+                         to the default executor of the running event loop
+        :raises ValidationError: if the configuration is not valid
+        """
+        return await _run_in_executor(executor, self.validate)
+
+    async def arender(self, files=True, executor=None):
+        """
+        Awaitable version of ``render`` which runs in ``executor``
+        without blocking the event loop
+
+        :param files: whether to include "additional files" in the output or not
+        :param executor: ``concurrent.futures.Executor`` instance, defaults
+                         to the default executor of the running event loop
+        :returns: string with output
+        """
+        return await _run_in_executor(executor, self.render, files)
+
+    async def agenerate(self, executor=None):
+        """
+        Awaitable version of ``generate`` which runs in ``executor``
+        without blocking the event loop
+
+        :param executor: ``concurrent.futures.Executor`` instance, defaults
+                         to the default executor of the running event loop
+        :returns: in-memory tar.gz archive, instance of ``BytesIO``
+        """
+        return await _run_in_executor(executor, self.generate)
 
     def _process_files(self, tar):
         """
@@ -360,8 +824,11 @@ class BaseBackend(object):
         to the intermediate data structure (self.intermediate_data) that will
         be then used by the renderer class to generate the router configuration
         """
-        self.validate()
-        self.intermediate_data = OrderedDict()
+        self._ensure_validated()
+        # the values are merged in place (same result of merge_config),
+        # converters may read the intermediate data built so far
+        merger = _ConfigMerger(list_identifiers=[".name"])
+        self.intermediate_data = merger.result
         for converter_class in self.converters:
             # skip unnecessary loop cycles
             if not converter_class.should_run_forward(self.config):
@@ -374,9 +841,7 @@ class BaseBackend(object):
             if value and isinstance(value, (tuple, list)):  # pragma: nocover
                 value = OrderedDict(value)
             if value:
-                self.intermediate_data = merge_config(
-                    self.intermediate_data, value, list_identifiers=[".name"]
-                )
+                merger.merge(value)
 
     def parse(self, native):
         """
@@ -407,15 +872,21 @@ class BaseBackend(object):
                     self.config, value, list_identifiers=self.list_identifiers
                 )
         self.__restore_intermediate_data()
-        self.validate()
+        self._ensure_validated()
 
     def __backup_intermediate_data(self):
-        self._intermediate_copy = deepcopy(self.intermediate_data)
+        # converters remove the blocks they process from a shallow
+        # copy of the intermediate data and modify only copies of
+        # those blocks, hence the original structure is left intact
+        self._original_intermediate_data = self.intermediate_data
+        self.intermediate_data = OrderedDict(
+            (key, copy(value)) for key, value in self.intermediate_data.items()
+        )
 
     def __restore_intermediate_data(self):
         del self.intermediate_data
-        self.intermediate_data = self._intermediate_copy
-        del self._intermediate_copy
+        self.intermediate_data = self._original_intermediate_data
+        del self._original_intermediate_data
 
 
 class BaseVpnBackend(BaseBackend):
@@ -434,21 +905,7 @@ class BaseVpnBackend(BaseBackend):
         :param tar: tarfile instance
         :returns: None
         """
-        text = self.render(files=False)
-        # create a list with all the packages (and remove empty entries)
-        vpn_instances = self.vpn_pattern.split(text)
-        if "" in vpn_instances:
-            vpn_instances.remove("")
-        # create a file for each VPN
-        for vpn in vpn_instances:
-            lines = vpn.split("\n")
-            # It's better to split lines[0] using
-            # `config_suffix` to extract the correct vpn_name
-            vpn_name = lines[0].split(self.config_suffix)[0]
-            text_contents = "\n".join(lines[2:])
-            # do not end with double new line
-            if text_contents.endswith("\n\n"):
-                text_contents = text_contents[0:-1]
+        for vpn_name, text_contents in self._render_parts():
             self._add_file(
                 tar=tar,
                 name="{0}{1}".format(vpn_name, self.config_suffix),
@@ -1,6 +1,6 @@
 from collections import OrderedDict
 
-from ...utils import get_copy, sorted_dict
+from ...utils import _copy_value, get_copy, sorted_dict
 
 
 class BaseConverter(object):
@@ -102,21 +102,42 @@ class BaseConverter(object):
             self.intermediate_data[self.intermediate_key]
         )
         # intermediate_data = list(self.intermediate_data[self.intermediate_key])
+        processed = set()
         # iterate over copied intermediate data structure
         for index, block in enumerate(intermediate_data):
             if self.should_skip_block(block):
                 continue
-            # remove processed block from intermediate data
-            # this makes processing remaining blocks easier
-            # for some backends
-            if remove_block:
-                self.intermediate_data[self.intermediate_key].remove(block)
+            processed.add(id(block))
             # specific converter operations are delegated
             # to the ``to_netjson_loop`` method
+            block = self._copy_block(block)
             result = self.to_netjson_loop(block, result, index + 1)
+        # remove processed blocks from intermediate data
+        # this makes processing remaining blocks easier
+        # for some backends
+        if remove_block:
+            self._remove_blocks(processed)
         # return result, expects dict
         return result
 
+    def _copy_block(self, block):
+        """
+        Returns a copy of ``block`` which can be modified during the
+        backward conversion, leaving the original intermediate data intact
+        """
+        return _copy_value(block)
+
+    def _remove_blocks(self, processed):
+        """
+        Removes the processed blocks (a ``set`` of their ``id``) from
+        the intermediate data structure in a single pass; blocks are
+        compared by identity because ``to_netjson_loop`` may modify them
+        """
+        if not processed:
+            return
+        blocks = self.intermediate_data[self.intermediate_key]
+        blocks[:] = [block for block in blocks if id(block) not in processed]
+
     def to_netjson_clean(self, intermediate_data):
         """
         Utility method called to pre-process the intermediate data structure
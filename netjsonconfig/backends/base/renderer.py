@@ -1,5 +1,51 @@
+import sys
+import threading
+from copy import copy
+
 from jinja2 import Environment, PackageLoader
 
+# jinja2 environments shared by all the renderers of the process
+_environments = {}
+_environments_lock = threading.Lock()
+
+
+def get_environment(package):
+    """
+    Returns the jinja2 ``Environment`` which loads the templates
+    contained in the ``templates`` directory of ``package``
+
+    Environments are created once per package and shared by all the
+    renderer and backend instances; templates are compiled on first use
+    and then kept in memory (``auto_reload`` is disabled because the
+    templates shipped with the package are not expected to change at
+    runtime).
+
+    Module names (eg: ``__module__``) are resolved to their package,
+    which contains the ``templates`` directory.
+
+    :param package: ``str`` representing the import name of the package
+                    (or of one of its modules)
+    :returns: ``jinja2.Environment`` instance
+    """
+    module = sys.modules.get(package)
+    if module is not None and not hasattr(module, "__path__"):
+        package = module.__package__
+    try:
+        return _environments[package]
+    except KeyError:
+        pass
+    with _environments_lock:
+        env = _environments.get(package)
+        if env is None:
+            env = Environment(
+                loader=PackageLoader(package, "templates"),
+                trim_blocks=True,
+                auto_reload=False,
+                cache_size=-1,
+            )
+            _environments[package] = env
+        return env
+
 
 class BaseRenderer(object):
     """
@@ -18,9 +64,7 @@ class BaseRenderer(object):
 
     @property
     def template_env(self):
-        return Environment(
-            loader=PackageLoader(self.env_path, "templates"), trim_blocks=True
-        )
+        return get_environment(self.env_path)
 
     @classmethod
     def get_name(cls):
@@ -41,10 +85,58 @@ class BaseRenderer(object):
         """
         Renders configuration by using the jinja2 templating engine
         """
+        context = getattr(self.backend, "intermediate_data", {})
+        return self._render_template(context)
+
+    def render_parts(self):
+        """
+        Renders the configuration split in the files which will be
+        included in the configuration archive
+
+        :returns: ``list`` of ``(name, contents)`` tuples
+        """
+        raise NotImplementedError()
+
+    def _render_template(self, data):
         # get jinja2 template
         template_name = "{0}.jinja2".format(self.get_name())
         template = self.template_env.get_template(template_name)
         # render template and cleanup
-        context = getattr(self.backend, "intermediate_data", {})
-        output = template.render(data=context)
+        output = template.render(data=data)
         return self.cleanup(output)
+
+
+class BaseVpnRenderer(BaseRenderer):
+    """
+    Shared logic between the renderers of VPN backends,
+    which generate one configuration file for each VPN instance
+
+    Requires the backend to define ``vpn_pattern`` and ``config_suffix``
+    """
+
+    def render_parts(self):
+        """
+        Renders each VPN instance separately
+
+        :returns: ``list`` of ``(vpn_name, contents)`` tuples
+        """
+        data = getattr(self.backend, "intermediate_data", {})
+        key = self.get_name()
+        parts = []
+        for vpn in data.get(key, []):
+            instance_data = copy(data)
+            instance_data[key] = [vpn]
+            text = self._render_template(instance_data)
+            # the first line contains the name of the VPN instance
+            # and is followed by an empty line
+            match = self.backend.vpn_pattern.match(text)
+            header, _, contents = text[match.end() :].partition("\n")  # noqa
+            contents = contents.partition("\n")[2]
+            # do not end with double new line
+            if contents.endswith("\n\n"):
+                contents = contents[0:-1]
+            # It's better to split the header using
+            # `config_suffix` to extract the correct vpn_name
+            vpn_name = header.split(self.backend.config_suffix)[0]
+            parts.append((vpn_name, contents))
+        return parts
@@ -16,17 +16,15 @@ class OpenVpnParser(BaseParser):
     def parse_tar(self, tar):
         fileobj = tar.buffer if hasattr(tar, "buffer") else tar
         tar = tarfile.open(fileobj=fileobj)
-        text = ""
-        for member in tar.getmembers():
+        vpns = []
+        # each member is decoded and parsed on its own
+        for member in tar:
             if not member.name.endswith(config_suffix):
                 continue
-            text += "# openvpn config: {name}\n\n{contents}\n".format(
-                **{
-                    "name": member.name.replace(config_suffix, ""),
-                    "contents": tar.extractfile(member).read().decode(),
-                }
-            )
-        return self.parse_text(text)
+            contents = tar.extractfile(member).read().decode()
+            name = member.name.replace(config_suffix, "")
+            vpns.append(self._get_options(name, contents.split("\n")))
+        return {"openvpn": vpns}
 
     def _get_vpns(self, text):
         results = re.split(vpn_pattern, text)
@@ -40,9 +38,11 @@ class OpenVpnParser(BaseParser):
 
     def _get_config(self, contents):
         lines = contents.split("\n")
-        name = lines[0]
+        return self._get_options(lines[0], lines[1:])
+
+    def _get_options(self, name, lines):
         config = {"name": name}
-        for line in lines[1:]:
+        for line in lines:
             line = line.strip()
             if not line:
                 continue
@@ -1,7 +1,7 @@
-from ..base.renderer import BaseRenderer
+from ..base.renderer import BaseVpnRenderer
 
 
-class OpenVpnRenderer(BaseRenderer):
+class OpenVpnRenderer(BaseVpnRenderer):
     """
     OpenVPN Renderer
     """
@@ -1,7 +1,4 @@
-import re
-
-from jinja2 import Environment, PackageLoader
-
+from ..base.renderer import get_environment
 from ..openwrt.openwrt import OpenWrt
 from .renderer import OpenWrtRenderer
 from .schema import schema
@@ -16,9 +13,15 @@ class OpenWisp(OpenWrt):
     renderer = OpenWrtRenderer
 
     def __init__(
-        self, config=None, native=None, templates=None, context=None, dsa=False
+        self,
+        config=None,
+        native=None,
+        templates=None,
+        context=None,
+        dsa=False,
+        native_serializer=True,
     ):
-        super().__init__(config, native, templates, context, dsa)
+        super().__init__(config, native, templates, context, dsa, native_serializer)
 
     def validate(self):
         self._sanitize_radios()
@@ -34,10 +37,7 @@ class OpenWisp(OpenWrt):
             radio.setdefault("disabled", False)
 
     def _render_template(self, template, context=None):
-        openwisp_env = Environment(
-            loader=PackageLoader(self.__module__, "templates"), trim_blocks=True
-        )
-        template = openwisp_env.get_template(template)
+        template = get_environment(self.__module__).get_template(template)
         context = context or {}
         return template.render(**context)
 
@@ -159,16 +159,8 @@ class OpenWisp(OpenWrt):
         :param tar: tarfile instance
         :returns: None
         """
-        uci = self.render(files=False)
-        # create a list with all the packages (and remove empty entries)
-        packages = re.split("package ", uci)
-        if "" in packages:
-            packages.remove("")
         # create a file for each configuration package used
-        for package in packages:
-            lines = package.split("\n")
-            package_name = lines[0]
-            text_contents = "\n".join(lines[2:])
+        for package_name, text_contents in self._render_parts():
             text_contents = "package {0}\n\n{1}".format(package_name, text_contents)
             self._add_file(
                 tar=tar,
@@ -21,4 +21,6 @@ class OpenWrtRenderer(BaseRenderer):
         option hostname 'openwisp-test'
     """
 
-    pass
+    block_format = "config '{0}' '{1}'"
+    option_format = "option '{0}' '{1}'"
+    list_format = "list '{0}' '{1}'"
@@ -64,6 +64,7 @@ class Default(OpenWrtConverter):
                 continue
             result.setdefault(package, [])
             for index, block in enumerate(contents):
+                block = self._copy_block(block)
                 _name = block.pop(".name")
                 _type = block.pop(".type")
                 # set `config_value` only if it hasn't
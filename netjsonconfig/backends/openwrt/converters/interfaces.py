@@ -2,7 +2,7 @@ from collections import OrderedDict
 from copy import deepcopy
 from ipaddress import ip_address, ip_interface
 
-from ....utils import merge_list
+from ....utils import _ListMerger
 from ..schema import schema
 from .base import OpenWrtConverter
 
@@ -45,6 +45,7 @@ class Interfaces(OpenWrtConverter):
         super().__init__(backend)
         self._device_config = {}
         self._bridge_vlan_config_uci = []
+        self._network_merger = None
 
     def __set_dsa_interface(self, interface):
         """
@@ -102,17 +103,25 @@ class Interfaces(OpenWrtConverter):
             if address:
                 uci_interface.update(address)
             result.setdefault("network", [])
-            # Use merge_list instead of appending the interface directly
+            # Merge instead of appending the interface directly
             # to allow users to override the auto-generated interface
             # (e.g., when using VLAN filtering on a bridge).
-            result["network"] = merge_list(
-                result["network"],
-                [self.sorted_dict(uci_interface)],
-                identifiers=[".name", ".type"],
-            )
+            self.__merge_interface(result, self.sorted_dict(uci_interface))
             i += 1
         return result
 
+    def __merge_interface(self, result, uci_interface):
+        """
+        Merges ``uci_interface`` in ``result["network"]`` like ``merge_list``
+        does, the blocks are indexed by name across the calls
+        """
+        merger = self._network_merger
+        if merger is None or merger.list is not result["network"]:
+            merger = _ListMerger(result["network"], identifiers=[".name", ".type"])
+            self._network_merger = merger
+            result["network"] = merger.list
+        merger.merge([uci_interface])
+
     def __intermediate_addresses(self, interface):
         """
         converts NetJSON address to
@@ -564,12 +573,15 @@ class Interfaces(OpenWrtConverter):
             self.intermediate_data[self.intermediate_key]
         )
         handler_fn = handler_fn or self.to_netjson_loop
-        for index, block in enumerate(list(intermediate_data), start=1):
+        processed = set()
+        for index, block in enumerate(intermediate_data, start=1):
             if skip_fn(block):
                 continue
-            if remove_block:
-                self.intermediate_data[self.intermediate_key].remove(block)
-            result = handler_fn(block, result, index)
+            processed.add(id(block))
+            result = handler_fn(self._copy_block(block), result, index)
+        # the next pass only sees the blocks which have not been processed
+        if remove_block:
+            self._remove_blocks(processed)
         return result
 
     def __process_device_block(self, block, result, index):
@@ -1,3 +1,5 @@
+from copy import copy
+
 from .base import OpenWrtConverter
 
 
@@ -395,24 +397,27 @@ class Wireless(OpenWrtConverter):
                 return interface
 
     def to_netjson_clean(self, intermediate_data):
-        result = super().to_netjson_clean(intermediate_data)
-        return self.__fix_netjson_network(result)
+        self.__fix_netjson_network(intermediate_data)
+        return super().to_netjson_clean(intermediate_data)
 
-    def __fix_netjson_network(self, result):
+    def __fix_netjson_network(self, intermediate_data):
         """
         Figures out whether it should remove the network attribute
         From the netjson wifi interface (because it's redundant)
         """
-        self._track_bridged_wifi(self.backend._intermediate_copy)
-        for index, interface in enumerate(result):
+        self._track_bridged_wifi(self.backend._original_intermediate_data)
+        for index, interface in enumerate(intermediate_data):
             try:
                 bridges = self._bridged_wifi[interface["ifname"]]
             except KeyError:
                 continue
             else:
                 if bridges == interface.get("network", "").split(" "):
-                    del result[index]["network"]
-        return result
+                    # the block is replaced because it
+                    # belongs to the original intermediate data
+                    interface = copy(interface)
+                    del interface["network"]
+                    intermediate_data[index] = interface
 
     def _track_bridged_wifi(self, intermediate_data=None):
         """
@@ -6,7 +6,7 @@ from ..vxlan.vxlan_wireguard import VxlanWireguard
 from ..wireguard.wireguard import Wireguard
 from ..zerotier.zerotier import ZeroTier
 from . import converters
-from .parser import OpenWrtParser, config_path, packages_pattern
+from .parser import OpenWrtParser, config_path
 from .renderer import OpenWrtRenderer
 from .schema import schema
 
@@ -37,22 +37,34 @@ class OpenWrt(BaseBackend):
     list_identifiers = ["name", "config_value", "id"]
 
     def __init__(
-        self, config=None, native=None, templates=None, context=None, dsa=True
+        self,
+        config=None,
+        native=None,
+        templates=None,
+        context=None,
+        dsa=True,
+        native_serializer=True,
     ):
         """
         :param config: ``dict`` containing a valid **NetJSON** configuration dictionary
         :param native: ``str`` or file object representing a native configuration that will
                        be parsed and converted to a **NetJSON** configuration dictionary
         :param templates: ``list`` containing **NetJSON** configuration dictionaries that
-                          will be used as a base for the main config
+                          will be used as a base for the main config, or an instance
+                          of ``netjsonconfig.TemplateStack``
         :param context: ``dict`` containing configuration variables
         :param dsa: ``bool`` flag to switch between OpenWrt configuration syntax.
                     ``True`` generates configuration in OpenWrt >21 syntax.
                     ``False`` generates configuration in OpenWrt <= 19 syntax.
+        :param native_serializer: ``bool`` flag to switch between UCI renderers.
+                                  ``True`` writes the UCI output directly (faster).
+                                  ``False`` renders it with the jinja2 template.
+                                  The output is the same.
         :raises TypeError: raised if ``config`` is not of type ``dict`` or if
                            ``templates`` is not of type ``list``
         """
         self.dsa = dsa
+        self.native_serializer = native_serializer
         super().__init__(config, native, templates, context)
 
     def validate(self):
@@ -83,16 +95,8 @@ class OpenWrt(BaseBackend):
         :param tar: tarfile instance
         :returns: None
         """
-        uci = self.render(files=False)
-        # create a list with all the packages (and remove empty entries)
-        packages = packages_pattern.split(uci)
-        if "" in packages:
-            packages.remove("")
         # create an UCI file for each configuration package used
-        for package in packages:
-            lines = package.split("\n")
-            package_name = lines[0]
-            text_contents = "\n".join(lines[2:])
+        for package_name, text_contents in self._render_parts():
             self._add_file(
                 tar=tar,
                 name="{0}{1}".format(config_path, package_name),
@@ -6,9 +6,153 @@ from ...utils import sorted_dict
 from ..base.parser import BaseParser
 
 packages_pattern = re.compile(r"^package\s", flags=re.MULTILINE)
-block_pattern = re.compile(r"^config\s", flags=re.MULTILINE)
-config_pattern = re.compile(r"^(option|list)\s*([^\s]*)\s*(.*)")
 config_path = "etc/config/"
+# UCI tokens: new lines, comments (only at the beginning of a token)
+# and words, which are made of single quoted strings (which may contain
+# new lines), double quoted strings (in which backslash escapes are
+# allowed), escaped characters and unquoted characters; quotes which
+# are never closed extend to the end of the line
+uci_token_pattern = re.compile(
+    r"""
+    (?P<newline>\n)
+    |[^\S\n]+
+    |\#[^\n]*
+    |(?P<word>(?:'[^']*'|"(?:[^"\\]|\\.)*"|\\.|[^\s'"\\]
+        |'[^'\n]*|"(?:[^"\\\n]|\\.)*|\\$)+)
+    """,
+    flags=re.VERBOSE | re.DOTALL,
+)
+uci_word_pattern = re.compile(
+    r"""'([^']*)'?|"((?:[^"\\]|\\.)*)"?|\\(.?)|([^'"\\]+)""",
+    flags=re.DOTALL,
+)
+uci_escape_pattern = re.compile(r"\\(.)", flags=re.DOTALL)
+
+
+def _unquote_uci_word(word):
+    """
+    Removes quotes and backslash escapes from a UCI word
+    """
+    # most words are not quoted nor escaped
+    if "'" not in word and '"' not in word and "\\" not in word:
+        return word
+    parts = []
+    for single, double, escaped, plain in uci_word_pattern.findall(word):
+        if double:
+            double = uci_escape_pattern.sub(r"\1", double)
+        # escaped new lines are line continuations
+        if escaped == "\n":
+            escaped = ""
+        parts.append(single or double or escaped or plain)
+    return "".join(parts)
+
+
+def _check_multiline_word(word):
+    """
+    Returns ``True`` if ``word`` ends with a quoted string which spans
+    multiple lines (eg: ``'line1\nline2'``), ``False`` if none of its
+    quoted strings contains new lines and ``None`` if a quoted string
+    is not closed or is followed by other parts of the word
+    """
+    parts = list(uci_word_pattern.finditer(word))
+    for index, part in enumerate(parts):
+        raw = part.group(0)
+        if raw[0] not in "'\"":
+            continue
+        contents = part.group(1) if raw[0] == "'" else part.group(2)
+        if len(raw) != len(contents) + 2 or raw[-1] != raw[0]:
+            return None
+        if "\n" in raw:
+            return True if index == len(parts) - 1 else None
+    return False
+
+
+def _tokenize_uci_statement(text, pos):
+    """
+    Tokenizes the statement which starts at ``pos`` (which may span
+    multiple lines) and returns it with the position of its end
+
+    A quoted string may span multiple lines only if its closing quote
+    ends the statement, otherwise ``None`` is returned instead of the
+    statement: the renderer does not escape quotes, so an apostrophe
+    in a value (eg: ``option ssid 'Bob's wifi'``) must not swallow
+    the following lines.
+    """
+    statement = []
+    multiline = False
+    for match in uci_token_pattern.finditer(text, pos):
+        if match.group("newline"):
+            return statement, match.start()
+        word = match.group("word")
+        if word is None:
+            continue
+        if multiline:
+            return None, match.end()
+        multiline = _check_multiline_word(word)
+        if multiline is None:
+            return None, match.end()
+        statement.append(_unquote_uci_word(word))
+    return statement, len(text)
+
+
+def _split_uci_line(line):
+    """
+    Splits a line which contains unbalanced quotes
+    by removing all of its quotes, eg:
+    ``option ssid 'Bob's wifi'`` becomes ``["option", "ssid", "Bobs wifi"]``
+    """
+    line = line.replace("'", "").replace('"', "")
+    return line.split(None, 2)
+
+
+def tokenize_uci(text):
+    """
+    Splits UCI text in statements in a single pass
+
+    :param text: ``str`` containing UCI configuration
+    :returns: generator of lists of unquoted words, eg:
+              ``["option", "hostname", "test"]``
+    """
+    lines = text.split("\n")
+    index = 0
+    pos = 0
+    while index < len(lines):
+        line = lines[index]
+        statement = None
+        # fast path for the most common forms of UCI lines, eg:
+        # "option key 'value'", "config type name", "package name"
+        if "\\" not in line and "#" not in line:
+            if "'" not in line and '"' not in line:
+                statement = line.split()
+            else:
+                parts = line.split(None, 2)
+                if len(parts) == 3:
+                    value = parts[2].rstrip()
+                    quote = value[0]
+                    if (
+                        quote in "'\""
+                        and len(value) > 1
+                        and value[-1] == quote
+                        and value.count(quote) == 2
+                        and "'" not in parts[0] + parts[1]
+                        and '"' not in parts[0] + parts[1]
+                    ):
+                        parts[2] = value[1:-1]
+                        statement = parts
+        # quotes, escapes and comments are handled by the tokenizer
+        if statement is None:
+            statement, end = _tokenize_uci_statement(text, pos)
+            if statement is None:
+                statement = _split_uci_line(line)
+            else:
+                # skip the lines consumed by the tokenizer
+                consumed = text.count("\n", pos, end)
+                index += consumed
+                pos = end - len(lines[index])
+        if statement:
+            yield statement
+        pos += len(lines[index]) + 1
+        index += 1
 
 
 class OpenWrtParser(BaseParser):
@@ -18,72 +162,77 @@ class OpenWrtParser(BaseParser):
     def parse_tar(self, tar):
         fileobj = tar.buffer if hasattr(tar, "buffer") else tar
         tar = tarfile.open(fileobj=fileobj)
-        text = ""
-        for member in tar.getmembers():
+        packages = OrderedDict()
+        # each member is decoded and parsed on its own
+        for member in tar:
             if not member.name.startswith(config_path):
                 continue
-            text += "package {name}\n\n{contents}".format(
-                **{
-                    "name": member.name.replace(config_path, ""),
-                    "contents": tar.extractfile(member).read().decode(),
-                }
+            self._get_uci_packages(
+                tar.extractfile(member).read().decode(),
+                packages=packages,
+                package=member.name.replace(config_path, ""),
             )
-        return self._get_uci_packages(text)
+        return packages
 
-    def _strip_quotes(self, value):
-        return value.replace("'", "").replace('"', "")
+    def _get_uci_packages(self, text, packages=None, package=None):
+        """
+        Parses UCI text in a single pass, see ``tokenize_uci``
 
-    def _get_uci_packages(self, text):
-        results = re.split(packages_pattern, text)
-        packages = OrderedDict()
-        for result in results:
-            result = result.strip()
-            if not result:
-                continue
-            lines = result.split("\n")
-            name = lines[0]
-            # fmt: off
-            contents = result[len(name):]
-            # fmt: on
-            packages[name] = self._get_uci_blocks(contents)
+        :param text: ``str`` containing UCI configuration
+        :param packages: ``OrderedDict`` to which packages are added
+        :param package: name of the package to which the blocks
+                        found before any ``package`` statement belong
+        :returns: ``OrderedDict`` of packages
+        """
+        if packages is None:
+            packages = OrderedDict()
+        blocks = None
+        if package is not None:
+            blocks = packages[package] = []
+        block = None
+        for statement in tokenize_uci(text):
+            keyword = statement[0]
+            if keyword in ("option", "list"):
+                if block is not None:
+                    self._set_uci_option(block, statement)
+            elif keyword == "config" and blocks is not None:
+                self._add_uci_block(blocks, block)
+                block = self._get_uci_block(statement, len(blocks) + 1)
+            elif keyword == "package":
+                self._add_uci_block(blocks, block)
+                block = None
+                blocks = packages[" ".join(statement[1:])] = []
+        self._add_uci_block(blocks, block)
         return packages
 
-    def _get_uci_blocks(self, text):
-        results = re.split(block_pattern, text)
-        blocks = []
-        counter = 0
-        for result in results:
-            result = result.strip()
-            if not result:
-                continue
-            counter += 1
-            lines = result.split("\n")
-            parts = lines[0].split()
-            config_type = self._strip_quotes(parts[0])
-            try:
-                config_name = self._strip_quotes(parts[1])
-            except IndexError:
-                config_name = "{0}_{1}".format(config_type, counter)
-            block = OrderedDict()
-            block[".type"] = config_type
-            block[".name"] = config_name
-            # loop over rest of lines
-            for line in lines[1:]:
-                match = re.search(config_pattern, line.strip())
-                if not match:
-                    continue
-                parts = match.groups()
-                key = self._strip_quotes(parts[1])
-                value = self._strip_quotes(parts[2])
-                # simple options
-                if parts[0] == "option":
-                    block[key] = value
-                # list options
-                else:
-                    block[key] = block.get(key, []) + [value]
-            self._set_uci_block_type(block)
-            blocks.append(sorted_dict(block))
-        return blocks
+    def _get_uci_block(self, statement, counter):
+        config_type = statement[1] if len(statement) > 1 else ""
+        try:
+            config_name = statement[2]
+        except IndexError:
+            config_name = "{0}_{1}".format(config_type, counter)
+        block = OrderedDict()
+        block[".type"] = config_type
+        block[".name"] = config_name
+        return block
+
+    def _set_uci_option(self, block, statement):
+        key = statement[1] if len(statement) > 1 else ""
+        value = " ".join(statement[2:])
+        # simple options
+        if statement[0] == "option":
+            block[key] = value
+        # list options
+        elif isinstance(block.get(key), list):
+            block[key].append(value)
+        else:
+            block[key] = [value]
+
+    def _add_uci_block(self, blocks, block):
+        if block is None:
+            return
+        self._set_uci_block_type(block)
+        blocks.append(sorted_dict(block))
 
     def _set_uci_block_type(self, block):
         # The new bridge syntax of OpenWrt moved "bridges"
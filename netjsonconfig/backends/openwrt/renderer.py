@@ -1,4 +1,21 @@
 from ..base.renderer import BaseRenderer
+from .parser import packages_pattern
+
+
+def _cleanup_line(line):
+    """
+    Applies the replacements of ``OpenWrtRenderer.cleanup``
+    to a single line of UCI output
+    """
+    if "    " in line:
+        line = line.replace("    ", "")
+    if "\n" in line:
+        line = (
+            line.replace("\noption", "\n\toption")
+            .replace("\nlist", "\n\tlist")
+            .replace("\n\n\n", "\n\n")
+        )
+    return line
 
 
 class OpenWrtRenderer(BaseRenderer):
@@ -6,6 +23,10 @@ class OpenWrtRenderer(BaseRenderer):
     OpenWRT Renderer
     """
 
+    block_format = "config {0} '{1}'"
+    option_format = "option {0} '{1}'"
+    list_format = "list {0} '{1}'"
+
     def cleanup(self, output):
         """
         Generates consistent OpenWRT/LEDE UCI output
@@ -23,3 +44,116 @@ class OpenWrtRenderer(BaseRenderer):
         if output.endswith("\n\n"):
             return output[0:-1]
         return output
+
+    def render(self):
+        """
+        Renders configuration with the native serializer or with
+        the jinja2 template (see the ``native_serializer`` argument
+        of the backend)
+        """
+        data = getattr(self.backend, "intermediate_data", {})
+        if not self._can_serialize(data):
+            return super().render()
+        return self.serialize(data)
+
+    def render_parts(self):
+        """
+        Renders each UCI package separately
+
+        :returns: ``list`` of ``(package_name, contents)`` tuples
+        """
+        data = getattr(self.backend, "intermediate_data", {})
+        if not self._can_serialize(data):
+            return self._split_packages(super().render())
+        parts = [
+            (package, self._serialize_package(blocks))
+            for package, blocks in data.items()
+        ]
+        # the last package ends with 1 new line only
+        if parts and parts[-1][1].endswith("\n\n"):
+            parts[-1] = (parts[-1][0], parts[-1][1][0:-1])
+        return parts
+
+    def _can_serialize(self, data):
+        """
+        Package names which would be modified by ``cleanup`` or
+        which contain new lines (which would interact with the blank
+        lines separating packages) are left to the jinja2 template
+        """
+        if not getattr(self.backend, "native_serializer", True):
+            return False
+        for package in data:
+            package = str(package)
+            if "\n" in package or "    " in "package {0}".format(package):
+                return False
+        return True
+
+    def _split_packages(self, uci):
+        """
+        Splits the UCI output rendered by the jinja2 template
+        """
+        # create a list with all the packages (and remove empty entries)
+        packages = packages_pattern.split(uci)
+        if "" in packages:
+            packages.remove("")
+        parts = []
+        for package in packages:
+            lines = package.split("\n")
+            parts.append((lines[0], "\n".join(lines[2:])))
+        return parts
+
+    def _get_lines(self, key, value):
+        """
+        Returns the ``option`` or ``list`` lines representing ``value``
+        """
+        if isinstance(value, str):
+            return [self.option_format.format(key, value)]
+        if value is True or value is False:
+            return [self.option_format.format(key, int(value))]
+        try:
+            iterator = iter(value)
+        except TypeError:
+            return [self.option_format.format(key, value)]
+        return [self.list_format.format(key, item) for item in iterator]
+
+    def _serialize_package(self, blocks):
+        """
+        Writes the config blocks of a package, each one followed by a blank line
+        """
+        output = []
+        append = output.append
+        for block in blocks:
+            line = self.block_format.format(
+                block.get(".type", ""), block.get(".name", "")
+            )
+            append(_cleanup_line(line))
+            for key, value in block.items():
+                if value in ["", None] or key.startswith("."):
+                    continue
+                for line in self._get_lines(key, value):
+                    append("\n\t")
+                    append(_cleanup_line(line))
+            append("\n\n")
+        return "".join(output)
+
+    def serialize(self, data):
+        """
+        Writes UCI output from ``intermediate_data``
+
+        The output is the same produced by the jinja2 template
+        followed by ``cleanup``, including the handling of booleans,
+        lists, empty values and special characters.
+
+        :param data: ``OrderedDict`` of packages and their config blocks
+        :returns: ``str`` containing UCI configuration
+        """
+        output = []
+        for package, blocks in data.items():
+            output.append(_cleanup_line("package {0}".format(package)))
+            output.append("\n\n")
+            output.append(self._serialize_package(blocks))
+        output = "".join(output)
+        # ensure output always ends with 1 new line
+        if output.endswith("\n\n"):
+            return output[0:-1]
+        return output
@@ -16,17 +16,14 @@ class ZeroTierParser(BaseParser):
     def parse_tar(self, tar):
         fileobj = tar.buffer if hasattr(tar, "buffer") else tar
         tar = tarfile.open(fileobj=fileobj)
-        text = ""
-        for member in tar.getmembers():
+        vpns = []
+        # each member is decoded and parsed on its own
+        for member in tar:
             if not member.name.endswith(config_suffix):
                 continue
-            text += "// zerotier controller config: {name}\n\n{contents}\n".format(
-                **{
-                    "name": member.name,
-                    "contents": tar.extractfile(member).read().decode(),
-                }
-            )
-        return self.parse_text(text)
+            contents = tar.extractfile(member).read().decode()
+            vpns.extend(self._get_vpn_config(contents))
+        return {"zerotier": vpns}
 
     def _get_vpn_config(self, text):
         # Remove comments from the vpn text
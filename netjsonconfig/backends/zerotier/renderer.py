@@ -1,7 +1,7 @@
-from ..base.renderer import BaseRenderer
+from ..base.renderer import BaseVpnRenderer
 
 
-class ZeroTierRenderer(BaseRenderer):
+class ZeroTierRenderer(BaseVpnRenderer):
     """
     ZeroTier Renderer
     """
@@ -0,0 +1,350 @@
+"""
+Parallel generation of the configuration of many devices
+
+The devices are split in chunks which are distributed over a pool of
+worker processes (``concurrent.futures.ProcessPoolExecutor``); each worker
+loads the schema validator and the jinja2 templates of the backend and
+merges the shared templates only once, when it starts.
+
+``run_jobs`` runs independent jobs instead, each one with its own backend,
+method and input, like the batch mode of the command line utility.
+"""
+
+import json
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from itertools import islice
+
+from . import get_backends
+from .backends.base.backend import BatchResult, get_validator
+from .backends.base.renderer import get_environment
+from .utils import TemplateStack
+
+#: backend methods which can be run by ``Fleet.map``,
+#: their output must be picklable
+METHODS = {
+    "generate": lambda backend: backend.generate().getvalue(),
+    "checksum": lambda backend: backend.checksum(),
+    "render": lambda backend: backend.render(),
+}
+
+#: methods which can be used by the jobs of ``run_jobs``
+JOB_METHODS = ["render", "generate", "checksum", "validate", "json"]
+
+# state of the worker process, see ``_init_worker`` and ``_init_jobs``
+_worker = {}
+
+
+def _warm_up(backend):
+    """
+    Loads the schema validator and compiles the jinja2 templates of ``backend``
+    """
+    schema = getattr(backend, "schema", None)
+    if schema:
+        get_validator(schema)
+    renderers = getattr(backend, "renderers", None) or [backend.renderer]
+    environments = [get_environment(renderer.__module__) for renderer in renderers]
+    # backends may render templates too (eg: the scripts of OpenWisp)
+    try:
+        environments.append(get_environment(backend.__module__))
+    except ValueError:
+        # the package of the backend does not contain templates
+        pass
+    for env in set(environments):
+        for name in env.list_templates():
+            env.get_template(name)
+
+
+def _init_worker(backend, templates, kwargs):
+    if templates:
+        templates = TemplateStack(templates)
+        templates.merge(backend.list_identifiers)
+    _warm_up(backend)
+    _worker.update(backend=backend, templates=templates, kwargs=kwargs)
+
+
+def _format_error(error):
+    """
+    Exceptions may not be picklable, a description is sent instead
+    """
+    return "{0}: {1}".format(type(error).__name__, error)
+
+
+def _run_chunk(method, start, devices):
+    """
+    Runs ``method`` on a chunk of devices in the worker process
+    """
+    backend = _worker["backend"]
+    batch = backend._iter_batch(
+        devices, _worker["templates"], _worker["kwargs"], METHODS[method]
+    )
+    results = []
+    for result in batch:
+        error = _format_error(result.error) if result.error else None
+        results.append(BatchResult(start + result.index, result.output, error))
+    return results
+
+
+def _chunks(items, size):
+    """
+    Splits ``items`` in ``(start, chunk)`` tuples lazily
+    """
+    items = iter(items)
+    start = 0
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def _submit(executor, func, chunks):
+    """
+    Submits the next chunk, returns ``None`` when there are no more chunks
+    """
+    for start, chunk in chunks:
+        return executor.submit(func, start, chunk)
+    return None
+
+
+def _map_chunks(executor, func, chunks, window):
+    """
+    Runs ``func`` on each chunk in ``executor``, keeping at most ``window``
+    chunks in progress, and yields the results in the order of the chunks
+    """
+    pending = deque()
+    while True:
+        while len(pending) < window:
+            future = _submit(executor, func, chunks)
+            if future is None:
+                break
+            pending.append(future)
+        if not pending:
+            return
+        yield from pending.popleft().result()
+
+
+class _JobRunner(object):
+    """
+    Runs the jobs of ``run_jobs``, the default templates
+    are loaded and merged only once
+    """
+
+    def __init__(self, defaults):
+        self.defaults = defaults
+        templates = defaults.get("templates")
+        self.templates = TemplateStack(templates) if templates else None
+
+    def run(self, start, jobs):
+        results = []
+        for index, job in enumerate(jobs, start):
+            try:
+                output = self._run_job(job)
+            except Exception as e:
+                results.append(BatchResult(index, None, _format_error(e)))
+            else:
+                results.append(BatchResult(index, output, None))
+        return results
+
+    def _get_option(self, job, key):
+        return job[key] if key in job else self.defaults.get(key)
+
+    def _run_job(self, job):
+        if isinstance(job, str):
+            job = json.loads(job)
+        if not isinstance(job, dict):
+            raise TypeError("job must be a JSON object")
+        backends = get_backends()
+        backend = self._get_option(job, "backend")
+        if backend not in backends:
+            raise ValueError("unknown backend: {0}".format(backend))
+        method = self._get_option(job, "method")
+        if method not in JOB_METHODS:
+            raise ValueError(
+                "method must be one of: {0}".format(", ".join(JOB_METHODS))
+            )
+        templates = job["templates"] if "templates" in job else self.templates
+        context = dict(self.defaults.get("context") or {})
+        context.update(job.get("context") or {})
+        instance = backends[backend](
+            config=job.get("config"), templates=templates, context=context
+        )
+        output = getattr(instance, method)(**(self._get_option(job, "args") or {}))
+        if method == "generate":
+            return output.getvalue()
+        return output
+
+
+def _init_jobs(defaults):
+    _worker.update(jobs=_JobRunner(defaults))
+
+
+def _run_jobs_chunk(start, jobs):
+    """
+    Runs a chunk of jobs in the worker process
+    """
+    return _worker["jobs"].run(start, jobs)
+
+
+def run_jobs(
+    jobs,
+    backend=None,
+    method="render",
+    templates=None,
+    context=None,
+    args=None,
+    workers=1,
+    chunksize=16,
+):
+    """
+    Runs independent jobs, each of which describes the input of a backend
+    and the method to call, and yields the results lazily in order
+
+    Each job is a ``dict`` (or a JSON string representing it) which may
+    contain the following keys, all of which except ``config`` default to
+    the corresponding arguments:
+
+    * ``config``: **NetJSON** configuration
+    * ``backend``: name of the backend, see ``netjsonconfig.get_backends``
+    * ``method``: one of ``JOB_METHODS``
+    * ``templates``: ``list`` of templates
+    * ``context``: ``dict`` of variables, merged over ``context``
+    * ``args``: ``dict`` of arguments passed to ``method``
+
+    The ``output`` of each ``BatchResult`` is the value returned by the
+    method (``bytes`` for ``generate``), while its ``error`` is a ``str``
+    describing the exception raised by the job.
+
+    :param jobs: iterable of jobs
+    :param workers: number of worker processes, when 1 (default)
+                    the jobs run in the current process
+    :param chunksize: number of jobs sent to a worker at once
+    :returns: generator of ``BatchResult`` instances
+    :raises TypeError: if ``templates`` is not valid
+    :raises ValueError: if ``workers`` or ``chunksize`` is less than 1
+    """
+    if workers < 1:
+        raise ValueError("workers must be greater than 0")
+    if chunksize < 1:
+        raise ValueError("chunksize must be greater than 0")
+    defaults = dict(
+        backend=backend, method=method, templates=templates, context=context, args=args
+    )
+    # loads the templates before starting
+    runner = _JobRunner(defaults)
+    if workers == 1:
+        return (
+            result
+            for start, chunk in _chunks(jobs, chunksize)
+            for result in runner.run(start, chunk)
+        )
+    return _run_jobs_parallel(jobs, defaults, workers, chunksize)
+
+
+def _run_jobs_parallel(jobs, defaults, workers, chunksize):
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_jobs, initargs=(defaults,)
+    ) as executor:
+        chunks = _chunks(jobs, chunksize)
+        yield from _map_chunks(executor, _run_jobs_chunk, chunks, workers * 2)
+
+
+class Fleet(object):
+    """
+    Pool of worker processes which generates the configuration
+    of many devices of the same backend, sharing the same templates
+
+    The pool is started once and can be reused by any number of ``map``
+    calls (eg: each time a shared template changes); it should be closed
+    with ``close`` or by using the fleet as a context manager.
+    """
+
+    def __init__(self, backend, templates=None, workers=None, chunksize=64, **kwargs):
+        """
+        :param backend: backend class (eg: ``netjsonconfig.OpenWrt``)
+        :param templates: ``list`` or ``TemplateStack`` shared by all devices
+        :param workers: number of worker processes, defaults to the number of CPUs
+        :param chunksize: number of devices sent to a worker at once
+        :param kwargs: any other argument accepted by the backend (eg: ``dsa``)
+        :raises TypeError: if ``templates`` is not valid
+        """
+        if templates:
+            # checked here, the workers receive the loaded templates
+            if not isinstance(templates, TemplateStack):
+                templates = TemplateStack(templates)
+            templates = templates.templates
+        if chunksize < 1:
+            raise ValueError("chunksize must be greater than 0")
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(backend, templates, kwargs),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Stops the worker processes
+        """
+        self._executor.shutdown()
+
+    def map(self, devices, method="generate", ordered=True):
+        """
+        Runs ``method`` for each device and yields the results lazily;
+        ``devices`` is consumed gradually, a limited number of chunks
+        is sent to the workers in advance
+
+        The ``output`` of each ``BatchResult`` depends on ``method``:
+
+        * ``generate``: ``bytes`` of the tar.gz archive
+        * ``checksum``: ``str`` returned by ``checksum``
+        * ``render``: ``str`` returned by ``render``
+
+        while its ``error`` is a ``str`` describing the exception
+        raised by the device (eg: ``"ValidationError: ..."``).
+
+        :param devices: iterable of ``(config, context)`` tuples,
+                        ``context`` may be ``None``
+        :param method: ``generate``, ``checksum`` or ``render``
+        :param ordered: when ``False`` results are yielded as soon as they are
+                        ready instead of following the order of ``devices``
+        :returns: generator of ``BatchResult`` instances
+        :raises ValueError: if ``method`` is not supported
+        """
+        if method not in METHODS:
+            raise ValueError("method must be one of: {0}".format(", ".join(METHODS)))
+        if ordered:
+            return self._map_ordered(devices, method)
+        return self._map_unordered(devices, method)
+
+    def _map_ordered(self, devices, method):
+        chunks = _chunks(devices, self.chunksize)
+        func = partial(_run_chunk, method)
+        return _map_chunks(self._executor, func, chunks, self.workers * 2)
+
+    def _map_unordered(self, devices, method):
+        chunks = _chunks(devices, self.chunksize)
+        func = partial(_run_chunk, method)
+        pending = set()
+        while True:
+            while len(pending) < self.workers * 2:
+                future = _submit(self._executor, func, chunks)
+                if future is None:
+                    break
+                pending.add(future)
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
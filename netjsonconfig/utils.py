@@ -1,6 +1,8 @@
+import json
 import re
 from collections import OrderedDict
-from copy import deepcopy
+from copy import copy, deepcopy
+from functools import lru_cache
 
 from jsonschema import ValidationError as JsonSchemaError
 
@@ -25,30 +27,55 @@ def merge_config(template, config, list_identifiers=None):
     :returns: merged ``dict``
     :raises ValidationError: if incompatible types are found
     """
-    result = deepcopy(template)
+    # shallow copy: keeps the type and the key order of ``template``,
+    # the values are copied below, each of them at most once
+    result = copy(template)
     for key, value in config.items():
-        existing = result.get(key)
-        if isinstance(value, dict) and isinstance(existing, dict):
-            result[key] = merge_config(existing, value, list_identifiers)
-        elif isinstance(value, list) and isinstance(existing, list):
-            result[key] = merge_list(existing, value, list_identifiers)
-        elif (
-            existing is not None
-            and isinstance(existing, (dict, list))
-            and isinstance(value, (dict, list))
-            and type(value) is not type(existing)
-        ):
-            raise ValidationError(
-                JsonSchemaError(
-                    f"Incompatible type for '{key}': expected {type(existing).__name__}, "
-                    f"got {type(value).__name__}."
-                )
-            )
-        else:
-            result[key] = value
+        result[key] = _merge_value(key, template.get(key), value, list_identifiers)
+    # values of the template which have not been
+    # touched by config are copied only here
+    for key, value in template.items():
+        if key not in config:
+            result[key] = _copy_value(value)
     return result
 
 
+def _merge_value(key, existing, value, list_identifiers=None):
+    """
+    Merges ``value`` on top of ``existing`` (the value of ``key``
+    in the template), see ``merge_config``
+    """
+    if isinstance(value, dict) and isinstance(existing, dict):
+        return merge_config(existing, value, list_identifiers)
+    if isinstance(value, list) and isinstance(existing, list):
+        return merge_list(existing, value, list_identifiers)
+    if (
+        existing is not None
+        and isinstance(existing, (dict, list))
+        and isinstance(value, (dict, list))
+        and type(value) is not type(existing)
+    ):
+        raise ValidationError(
+            JsonSchemaError(
+                f"Incompatible type for '{key}': expected {type(existing).__name__}, "
+                f"got {type(value).__name__}."
+            )
+        )
+    return value
+
+
+_scalar_types = (str, int, float, bool, type(None))
+
+
+def _copy_value(value):
+    """
+    Returns a deep copy of ``value``, skips immutable scalars
+    """
+    if isinstance(value, _scalar_types):
+        return value
+    return deepcopy(value)
+
+
 def merge_list(list1, list2, identifiers=None):
     """
     Merges ``list2`` on top of ``list1``.
@@ -69,6 +96,8 @@ def merge_list(list1, list2, identifiers=None):
     counter = 1
     for list_ in [list1, list2]:
         container = dict_map["list{0}".format(counter)]
+        if counter == 2:
+            list1_index = _ElementIndex(dict_map["list1"].values())
         for el in list_:
             # merge by internal python id by default
             key = id(el)
@@ -77,7 +106,7 @@ def merge_list(list1, list2, identifiers=None):
             # This is needed because some templates may share
             # one or multiple common files and these do not
             # not have to be duplicated.
-            if counter == 2 and el in dict_map["list1"].values():
+            if counter == 2 and el in list1_index:
                 continue
             # if el is a dict, merge by keys specified in ``identifiers``
             if isinstance(el, dict):
@@ -89,12 +118,255 @@ def merge_list(list1, list2, identifiers=None):
             # hashable and can be used as a dictionary key
             if isinstance(key, list):
                 key = tuple(key)
-            container[key] = deepcopy(el)
+            # elements of list1 are copied by merge_config (at most once),
+            # elements of list2 are copied now because merge_config
+            # does not copy the values coming from its config argument
+            container[key] = el if counter == 1 else _copy_value(el)
         counter += 1
     merged = merge_config(dict_map["list1"], dict_map["list2"])
     return list(merged.values())
 
 
+def _freeze(value):
+    """
+    Returns a hashable representation of ``value``:
+    values which are equal get equal representations
+    """
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(val)) for key, val in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(val) for val in value)
+    return value
+
+
+class _ElementIndex(object):
+    """
+    Container of list elements which allows to look for
+    an element equal to a given value without scanning all of them:
+    elements are grouped by a hash of their structure and only
+    the elements of the same group are compared with ``==``
+    """
+
+    def __init__(self, elements=None):
+        self._groups = {}
+        # elements containing unhashable values (eg: sets)
+        self._unhashable = []
+        for element in elements or []:
+            self.add(element)
+
+    def add(self, element):
+        try:
+            key = hash(_freeze(element))
+        except TypeError:
+            self._unhashable.append(element)
+        else:
+            self._groups.setdefault(key, []).append(element)
+
+    def remove(self, element):
+        """
+        Removes ``element`` (compared by identity)
+        """
+        try:
+            group = self._groups[hash(_freeze(element))]
+        except TypeError:
+            group = self._unhashable
+        for index, value in enumerate(group):
+            if value is element:
+                del group[index]
+                return
+        raise ValueError("element not found")
+
+    def __contains__(self, value):
+        try:
+            candidates = self._groups.get(hash(_freeze(value)), [])
+        except TypeError:
+            candidates = [el for group in self._groups.values() for el in group]
+        for element in candidates + self._unhashable:
+            if element is value or element == value:
+                return True
+        return False
+
+
+class _ListMerger(object):
+    """
+    Merges lists on top of ``elements`` in place: the result (``self.list``)
+    is the same obtained by calling ``merge_list`` once for each list, but
+    the elements which are not overridden are neither copied nor indexed again
+
+    Elements may also be appended to ``self.list`` directly between
+    merges, as if they were part of the first list of ``merge_list``
+    """
+
+    def __init__(self, elements, identifiers=None):
+        self.identifiers = identifiers or []
+        self.list = list(elements)
+        self._positions = {}
+        self._index = _ElementIndex()
+        self._synced = 0
+        self._sync()
+
+    def _sync(self):
+        """
+        Indexes the elements appended to ``self.list`` since the last merge:
+        elements with the same key replace the previous one in its position
+        """
+        appended = self.list[self._synced :]  # noqa
+        del self.list[self._synced :]  # noqa
+        for element in appended:
+            key, _ = self._get_key(element)
+            position = self._positions.get(key)
+            if position is None:
+                self._positions[key] = len(self.list)
+                self.list.append(element)
+            else:
+                self._index.remove(self.list[position])
+                self.list[position] = element
+            self._index.add(element)
+        self._synced = len(self.list)
+
+    def _get_key(self, element):
+        """
+        Returns the key used by ``merge_list`` and whether it is
+        the python id of the element (no identifier found)
+        """
+        if isinstance(element, dict):
+            for id_key in self.identifiers:
+                if id_key in element:
+                    key = element[id_key]
+                    if isinstance(key, list):
+                        key = tuple(key)
+                    return key, False
+        return id(element), True
+
+    def merge(self, elements):
+        """
+        Merges ``elements`` on top of the current ones, see ``merge_list``
+        """
+        self._sync()
+        merging = OrderedDict()
+        for element in elements:
+            # skip elements identical to existing ones
+            if element in self._index:
+                continue
+            key, by_id = self._get_key(element)
+            merging[key] = (_copy_value(element), by_id)
+        for key, (element, by_id) in merging.items():
+            if by_id:
+                # the original element may be garbage collected
+                # and its id reused, the copy is indexed instead
+                key = id(element)
+            position = self._positions.get(key)
+            if position is None:
+                self._positions[key] = len(self.list)
+                self.list.append(element)
+            else:
+                existing = self.list[position]
+                self._index.remove(existing)
+                element = _merge_value(key, existing, element)
+                self.list[position] = element
+            self._index.add(element)
+        self._synced = len(self.list)
+
+
+class _ConfigMerger(object):
+    """
+    Merges many configuration dictionaries one on top of the other
+    in ``self.result``: the result is the same obtained by calling
+    ``merge_config`` once for each dictionary, but the lists which are
+    merged many times (eg: the packages of the intermediate data
+    structure) are merged in place by ``_ListMerger`` instead of
+    being copied at each call
+    """
+
+    def __init__(self, list_identifiers=None):
+        self.list_identifiers = list_identifiers
+        self.result = OrderedDict()
+        self._lists = {}
+
+    def merge(self, config):
+        result = self.result
+        for key, value in config.items():
+            existing = result.get(key)
+            merger = self._lists.pop(key, None)
+            if isinstance(value, list) and isinstance(existing, list):
+                if merger is None:
+                    merger = _ListMerger(existing, self.list_identifiers)
+                    result[key] = merger.list
+                merger.merge(value)
+                self._lists[key] = merger
+            else:
+                result[key] = _merge_value(key, existing, value, self.list_identifiers)
+
+
+def load_config(config):
+    """
+    Loads a configuration dictionary from a ``dict`` or a JSON string
+
+    :param config: ``dict`` or ``str``
+    :returns: ``dict``
+    :raises TypeError: if ``config`` is neither a ``dict`` nor a valid JSON object
+    """
+    if isinstance(config, str):
+        try:
+            config = json.loads(config)
+        except ValueError:
+            pass
+    if not isinstance(config, dict):
+        raise TypeError(
+            "config block must be an instance of dict or a valid NetJSON string"
+        )
+    return config
+
+
+class TemplateStack(object):
+    """
+    Ordered list of templates which is loaded and merged only once
+    and can then be reused as the ``templates`` argument of any number
+    of backend instances, each of which will only merge its own
+    configuration on top of it.
+
+    The result is the same as passing the list of templates directly.
+    """
+
+    def __init__(self, templates):
+        """
+        :param templates: ``list`` containing **NetJSON** configuration
+                          dictionaries or JSON strings
+        :raises TypeError: raised if ``templates`` is not of type ``list``
+                           or if any template is not valid
+        """
+        if not isinstance(templates, list):
+            raise TypeError("templates argument must be an instance of list")
+        # copy templates to avoid being affected by later changes
+        self.templates = [deepcopy(load_config(template)) for template in templates]
+        self._merged = {}
+
+    def __len__(self):
+        return len(self.templates)
+
+    def __iter__(self):
+        return iter(self.templates)
+
+    def merge(self, list_identifiers=None):
+        """
+        Returns the templates merged together
+
+        The result is computed once for each distinct value of
+        ``list_identifiers`` (which depends on the backend) and must
+        not be modified.
+
+        :param list_identifiers: ``list`` or ``None``
+        :returns: merged ``dict``
+        """
+        key = tuple(list_identifiers or [])
+        if key not in self._merged:
+            result = {}
+            for template in self.templates:
+                result = merge_config(result, template, list_identifiers)
+            self._merged[key] = result
+        return self._merged[key]
+
+
 def sorted_dict(dict_):
     return OrderedDict(sorted(dict_.items()))
 
@@ -102,6 +374,42 @@ def sorted_dict(dict_):
 var_pattern = re.compile(r"\{\{\s*(\w*)\s*\}\}")
 
 
+@lru_cache(maxsize=4096)
+def _parse_vars(string):
+    """
+    Splits ``string`` in a tuple of segments in which the items with
+    even index are literal text while the items with odd index are
+    ``(name, placeholder)`` tuples representing variables, eg:
+
+    ``"a {{ b }} c"`` becomes ``("a ", ("b", "{{ b }}"), " c")``
+    """
+    segments = []
+    position = 0
+    for match in var_pattern.finditer(string):
+        segments.append(string[position : match.start()])  # noqa
+        segments.append((match.group(1), match.group(0)))
+        position = match.end()
+    segments.append(string[position:])
+    return tuple(segments)
+
+
+def _render_vars(segments, context):
+    """
+    Joins the segments returned by ``_parse_vars``, variables
+    not present in ``context`` are left untouched
+    """
+    if len(segments) == 1:
+        return segments[0]
+    output = []
+    for index, segment in enumerate(segments):
+        if index % 2 == 0:
+            output.append(segment)
+            continue
+        name, placeholder = segment
+        output.append(str(context[name]) if name in context else placeholder)
+    return "".join(output)
+
+
 def evaluate_vars(data, context=None):
     """
     Evaluates variables in ``data``
@@ -119,24 +427,77 @@ def evaluate_vars(data, context=None):
             loop_items = enumerate(data)
         for key, value in loop_items:
             data[key] = evaluate_vars(value, context)
-    elif isinstance(data, str):
-        vars_found = var_pattern.findall(data)
-        for var in vars_found:
-            var = var.strip()
-            # if found multiple variables, create a new regexp pattern for each
-            # variable, otherwise different variables would get the same value
-            # (see https://github.com/openwisp/netjsonconfig/issues/55)
-            if len(vars_found) > 1:
-                pattern = r"\{\{(\s*%s\s*)\}\}" % var
-            # in case of single variables, use the precompiled
-            # regexp pattern to save computation
-            else:
-                pattern = var_pattern
-            if var in context:
-                data = re.sub(pattern, str(context[var]), data)
+    # strings without variables (most of them) are
+    # returned immediately, without using regular expressions
+    elif isinstance(data, str) and "{{" in data:
+        # each string is scanned once and all its variables
+        # (which may be repeated) are replaced in the same pass
+        data = _render_vars(_parse_vars(data), context)
     return data
 
 
+class VariableSlotMap(object):
+    """
+    Locations of the variables contained in a configuration
+
+    The configuration is scanned only once, the resulting map can then
+    be used to evaluate the variables of any number of configurations
+    having the same structure (eg: copies of the same merged templates)
+    by visiting only the strings which contain variables.
+    """
+
+    def __init__(self, data):
+        """
+        :param data: data structure containing variables, may be
+                     ``str``, ``dict`` or ``list``
+        """
+        #: ``tuple`` of ``(path, segments)`` pairs, where ``path`` is the
+        #: tuple of keys and indexes which lead to a string containing
+        #: variables and ``segments`` is the parsed form of that string
+        self.slots = tuple(self._scan(data, ()))
+        #: ``frozenset`` of the variable names referenced in ``data``
+        self.variables = frozenset(
+            segment[0] for path, segments in self.slots for segment in segments[1::2]
+        )
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _scan(self, data, path):
+        if isinstance(data, dict):
+            loop_items = data.items()
+        elif isinstance(data, list):
+            loop_items = enumerate(data)
+        else:
+            if isinstance(data, str) and "{{" in data:
+                segments = _parse_vars(data)
+                if len(segments) > 1:
+                    yield path, segments
+            return
+        for key, value in loop_items:
+            yield from self._scan(value, path + (key,))
+
+    def evaluate(self, data, context=None):
+        """
+        Evaluates variables in ``data``, which must have the same
+        structure of the data structure which has been scanned
+
+        :param data: data structure containing variables, it's
+                     modified in place (pass a copy to preserve it)
+        :param context: ``dict`` containing variables
+        :returns: modified data structure
+        """
+        context = context or {}
+        for path, segments in self.slots:
+            if not path:
+                return _render_vars(segments, context)
+            container = data
+            for key in path[:-1]:
+                container = container[key]
+            container[path[-1]] = _render_vars(segments, context)
+        return data
+
+
 def get_copy(dict_, key, default=None):
     """
     Looks for a key in a dictionary, if found returns
@@ -189,6 +189,19 @@ config 'system' 'system'
         o.generate()
         o.generate()
 
+    def test_generation_revalidates_added_files(self):
+        o = OpenWisp(self.config)
+        with patch.object(
+            OpenWisp, "validate", autospec=True, side_effect=OpenWisp.validate
+        ) as validate:
+            o.render()
+            o.render()
+            self.assertEqual(validate.call_count, 1)
+            # install.sh and the other scripts are added to the files
+            o.generate()
+            o.render()
+            self.assertEqual(validate.call_count, 2)
+
     def test_wireless_radio_disabled_0(self):
         o = OpenWisp({"radios": self.config["radios"]})
         output = o.render()
@@ -267,3 +280,27 @@ config 'system' 'system'
     def test_default_dsa(self):
         o = OpenWisp({"general": {"hostname": "test"}})
         self.assertEqual(o.dsa, False)
+
+    def test_native_serializer(self):
+        config = deepcopy(self.config)
+        config["custom"] = [{"config_name": "test", "enabled": True, "items": ["a", 1]}]
+        native = OpenWisp(config).render()
+        self.assertTrue(OpenWisp(config).native_serializer)
+        template = OpenWisp(config, native_serializer=False)
+        self.assertEqual(template.render(), native)
+        self.assertEqual(
+            template.generate().getvalue(),
+            OpenWisp(config, native_serializer=True).generate().getvalue(),
+        )
+        with patch.object(OpenWisp.renderer, "serialize") as serialize:
+            template.render()
+        serialize.assert_not_called()
+        self.assertIn("config 'test' 'test_1'\n\toption 'enabled' '1'", native)
+
+    def test_checksum_method(self):
+        o = OpenWisp(self.config)
+        checksum = o.checksum()
+        # install.sh and uninstall.sh are added to
+        # the configuration but the result is cached
+        self.assertEqual(o.checksum(), checksum)
+        self.assertEqual(OpenWisp(self.config).checksum(), checksum)
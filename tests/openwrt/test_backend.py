@@ -1,11 +1,14 @@
 import json
 import os
 import tarfile
+import tempfile
 import unittest
+from copy import deepcopy
 from hashlib import md5
 from time import sleep
+from unittest import mock
 
-from netjsonconfig import OpenWrt
+from netjsonconfig import OpenWrt, TemplateStack
 from netjsonconfig.exceptions import ValidationError
 from netjsonconfig.utils import _TabsMixin
 
@@ -19,6 +22,90 @@ class TestBackend(unittest.TestCase, _TabsMixin):
         o.validate()
         self.assertDictEqual(config, {"interfaces": []})
 
+    _owned_config = {
+        "general": {"hostname": "{{ name }}"},
+        "interfaces": [{"name": "eth0", "type": "ethernet"}],
+    }
+
+    def test_config_copy_context(self):
+        config = deepcopy(self._owned_config)
+        o = OpenWrt(config, context={"name": "router1"})
+        self.assertIsNot(o.config, config)
+        self.assertEqual(o.config["general"]["hostname"], "router1")
+        self.assertDictEqual(config, self._owned_config)
+
+    def test_from_owned(self):
+        config = deepcopy(self._owned_config)
+        expected = OpenWrt(deepcopy(config), context={"name": "router1"})
+        with mock.patch("netjsonconfig.backends.base.backend.deepcopy") as copy:
+            o = OpenWrt.from_owned(config, context={"name": "router1"})
+        copy.assert_not_called()
+        self.assertIsInstance(o, OpenWrt)
+        self.assertIs(o.config, config)
+        self.assertEqual(config["general"]["hostname"], "router1")
+        self.assertEqual(o.render(), expected.render())
+        # the ownership is not transferred to other instances
+        config = deepcopy(self._owned_config)
+        OpenWrt(config, context={"name": "router1"})
+        self.assertDictEqual(config, self._owned_config)
+
+    def test_from_owned_kwargs(self):
+        config = deepcopy(self._owned_config)
+        o = OpenWrt.from_owned(
+            config,
+            templates=[{"general": {"timezone": "UTC"}}],
+            context={"name": "router1"},
+            dsa=False,
+        )
+        self.assertFalse(o.dsa)
+        self.assertEqual(o.config["general"]["timezone"], "UTC")
+        self.assertEqual(o.config["general"]["hostname"], "router1")
+
+    def test_json_string_not_copied(self):
+        with mock.patch("netjsonconfig.backends.base.backend.deepcopy") as copy:
+            o = OpenWrt(json.dumps(self._owned_config))
+        copy.assert_not_called()
+        self.assertDictEqual(o.config, self._owned_config)
+
+    def test_render_many_sections(self):
+        config = {
+            "radios": [
+                {
+                    "name": f"radio{i}",
+                    "protocol": "802.11n",
+                    "channel": 1,
+                    "channel_width": 20,
+                }
+                for i in range(50)
+            ],
+            "interfaces": [
+                {
+                    "name": f"wlan{i}",
+                    "type": "wireless",
+                    "wireless": {
+                        "radio": f"radio{i % 50}",
+                        "mode": "access_point",
+                        "ssid": f"ssid{i}",
+                    },
+                }
+                for i in range(200)
+            ],
+            "routes": [
+                {
+                    "device": f"wlan{i % 200}",
+                    "next": "10.0.0.1",
+                    "destination": f"10.{i // 256}.{i % 256}.0/24",
+                    "cost": 0,
+                }
+                for i in range(500)
+            ],
+        }
+        native = OpenWrt(config).render()
+        self.assertEqual(native.count("config wifi-device"), 50)
+        self.assertEqual(native.count("config wifi-iface"), 200)
+        self.assertEqual(native.count("config route"), 500)
+        self.assertIn("config route 'route500'", native)
+
     def test_json_method(self):
         config = {
             "type": "DeviceConfiguration",
@@ -189,6 +276,30 @@ config wifi-iface 'wifi_wlan0'
         o = OpenWrt(self._config1)
         self.assertEqual(o.render(), o.render())
 
+    def test_render_validates_once(self):
+        o = OpenWrt({"general": {"hostname": "test"}})
+        with mock.patch.object(
+            OpenWrt, "validate", autospec=True, side_effect=OpenWrt.validate
+        ) as validate:
+            o.render()
+            o.render()
+            o.generate()
+            o.json()
+            self.assertEqual(validate.call_count, 1)
+            o.config["general"]["hostname"] = "changed"
+            o.render()
+            self.assertEqual(validate.call_count, 2)
+            # explicit calls are never skipped
+            o.validate()
+            self.assertEqual(validate.call_count, 3)
+
+    def test_render_revalidates_changed_config(self):
+        o = OpenWrt({"general": {"hostname": "test"}})
+        o.render()
+        o.config["general"]["hostname"] = ["wrong"]
+        with self.assertRaises(ValidationError):
+            o.render()
+
     def test_write(self):
         o = OpenWrt({"general": {"hostname": "test"}})
         o.write(name="test", path="/tmp")
@@ -197,11 +308,259 @@ config wifi-iface 'wifi_wlan0'
         tar.close()
         os.remove("/tmp/test.tar.gz")
 
+    def test_generate_to(self):
+        o = OpenWrt({"general": {"hostname": "test"}})
+        with open("/tmp/test_generate_to.tar.gz", "wb") as f:
+            o.generate_to(f)
+        with open("/tmp/test_generate_to.tar.gz", "rb") as f:
+            # the name of the file must not end up in the gzip header
+            self.assertEqual(f.read(), o.generate().getvalue())
+        os.remove("/tmp/test_generate_to.tar.gz")
+        o.write(name="test", path="/tmp")
+        with open("/tmp/test.tar.gz", "rb") as f:
+            self.assertEqual(f.read(), o.generate().getvalue())
+        os.remove("/tmp/test.tar.gz")
+
+    def test_write_error(self):
+        o = OpenWrt({"general": {"hostname": "test"}})
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.object(OpenWrt, "_process_files", side_effect=OSError):
+                with self.assertRaises(OSError):
+                    o.write(name="test", path=directory)
+            # no truncated archive is left
+            self.assertEqual(os.listdir(directory), [])
+            o.write(name="test", path=directory)
+            with mock.patch.object(OpenWrt, "_process_files", side_effect=OSError):
+                with self.assertRaises(OSError):
+                    o.write(name="test", path=directory)
+            # the previous archive is not affected
+            self.assertEqual(os.listdir(directory), ["test.tar.gz"])
+            with open(os.path.join(directory, "test.tar.gz"), "rb") as f:
+                self.assertEqual(f.read(), o.generate().getvalue())
+
+    _batch_templates = [
+        {"general": {"timezone": "UTC", "description": "{{ site }}"}},
+        {"interfaces": [{"name": "eth0", "type": "ethernet", "mtu": 1500}]},
+    ]
+    _batch_devices = [
+        ({"general": {"hostname": "router1"}}, {"site": "rome"}),
+        ({"general": {"hostname": "x"}}, None),
+        ({"general": {"hostname": "router3"}}, {"site": "milan"}),
+    ]
+
+    def test_render_many(self):
+        results = list(
+            OpenWrt.render_many(self._batch_devices, templates=self._batch_templates)
+        )
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        for result, (config, context) in zip(results, self._batch_devices):
+            if result.error:
+                continue
+            expected = OpenWrt(config, templates=self._batch_templates, context=context)
+            self.assertEqual(result.output, expected.render())
+        self.assertIn("option hostname 'router3'", results[2].output)
+        self.assertIn("option description 'milan'", results[2].output)
+        # errors of single devices are collected
+        self.assertIsNone(results[1].output)
+        self.assertIsInstance(results[1].error, ValidationError)
+        self.assertIsNone(results[0].error)
+
+    def test_render_many_options(self):
+        devices = [({"general": {"hostname": "router1"}}, {})]
+        stack = TemplateStack(self._batch_templates)
+        result = next(OpenWrt.render_many(devices, templates=stack, dsa=False))
+        self.assertIn("option ifname 'eth0'", result.output)
+        self.assertIn("option description '{{ site }}'", result.output)
+        files = [{"path": "/etc/test", "mode": "0644", "contents": "test"}]
+        result = next(OpenWrt.render_many([({"files": files}, None)], files=False))
+        self.assertNotIn("/etc/test", result.output)
+        # invalid items are reported as errors too
+        results = list(OpenWrt.render_many([(None, None), "invalid"]))
+        self.assertIsInstance(results[0].error, ValueError)
+        self.assertIsInstance(results[1].error, ValueError)
+
+    def test_render_many_lazy(self):
+        def devices():
+            yield self._batch_devices[0]
+            raise AssertionError("consumed too early")
+
+        results = OpenWrt.render_many(devices())
+        self.assertEqual(next(results).index, 0)
+
+    def test_render_many_invalid_templates(self):
+        with self.assertRaises(TypeError):
+            OpenWrt.render_many(self._batch_devices, templates="invalid")
+
+    def test_render_many_invalid_arguments(self):
+        for kwargs in [{"WRONG": True}, {"context": {}}, {"native": ""}]:
+            with self.subTest(kwargs=kwargs):
+                with self.assertRaises(TypeError):
+                    OpenWrt.render_many(self._batch_devices, **kwargs)
+                with self.assertRaises(TypeError):
+                    OpenWrt.generate_many(self._batch_devices, **kwargs)
+
+    def test_generate_many(self):
+        results = list(
+            OpenWrt.generate_many(self._batch_devices, templates=self._batch_templates)
+        )
+        self.assertIsInstance(results[1].error, ValidationError)
+        config, context = self._batch_devices[2]
+        expected = OpenWrt(config, templates=self._batch_templates, context=context)
+        self.assertEqual(results[2].output.getvalue(), expected.generate().getvalue())
+
+    def test_checksum_method(self):
+        config = {
+            "general": {"hostname": "test"},
+            "files": [{"path": "/etc/test", "contents": "test", "mode": "0644"}],
+        }
+        o = OpenWrt(config)
+        self.assertEqual(
+            o.checksum(),
+            "80c27a65c0f3ed4bac9c495fc117b34c4c6dcd286c05bcfe052a091026f93d0a",
+        )
+        self.assertEqual(o.checksum(), OpenWrt(deepcopy(config)).checksum())
+        changes = [
+            ("contents", "test2"),
+            ("mode", "0755"),
+            ("path", "/etc/test2"),
+        ]
+        for key, value in changes:
+            with self.subTest(key):
+                changed = deepcopy(config)
+                changed["files"][0][key] = value
+                self.assertNotEqual(o.checksum(), OpenWrt(changed).checksum())
+        # equivalent modes produce the same archive
+        same = deepcopy(config)
+        same["files"][0]["mode"] = "644"
+        self.assertEqual(o.checksum(), OpenWrt(same).checksum())
+
+    def test_checksum_cache(self):
+        o = OpenWrt({"general": {"hostname": "test"}})
+        with mock.patch.object(
+            OpenWrt, "_generate_contents", wraps=o._generate_contents
+        ) as generate_contents:
+            checksum = o.checksum()
+            self.assertEqual(o.checksum(), checksum)
+            self.assertEqual(generate_contents.call_count, 1)
+            o.config["general"]["hostname"] = "test2"
+            o.intermediate_data = None
+            self.assertNotEqual(o.checksum(), checksum)
+            self.assertEqual(generate_contents.call_count, 2)
+
     def test_templates_type_error(self):
         config = {"general": {"hostname": "test_templates"}}
         with self.assertRaises(TypeError):
             OpenWrt(config, templates={"a": "a"})
 
+    def test_template_stack_type_error(self):
+        with self.assertRaises(TypeError):
+            TemplateStack({"a": "a"})
+        with self.assertRaises(TypeError):
+            TemplateStack(["O{]O"])
+
+    def test_template_stack(self):
+        templates = [
+            {
+                "interfaces": [{"name": "eth0", "type": "ethernet", "mtu": 1500}],
+                "files": [
+                    {"path": "/etc/shared", "mode": "0644", "contents": "shared"}
+                ],
+            },
+            json.dumps(
+                {
+                    "general": {"hostname": "{{ name }}"},
+                    "interfaces": [{"name": "eth0", "type": "ethernet", "mtu": 1400}],
+                    "files": [
+                        {"path": "/etc/shared", "mode": "0644", "contents": "shared"},
+                        {"path": "/etc/{{ name }}", "mode": "0644", "contents": "x"},
+                    ],
+                }
+            ),
+        ]
+        stack = TemplateStack(templates)
+        self.assertEqual(len(stack), 2)
+        merged = deepcopy(stack.merge(OpenWrt.list_identifiers))
+        for index in range(3):
+            config = {
+                "interfaces": [
+                    {"name": "eth0", "type": "ethernet", "mtu": 1300 + index},
+                    {"name": f"eth{index + 1}", "type": "ethernet"},
+                ]
+            }
+            context = {"name": f"device{index}"}
+            expected = OpenWrt(config, templates=templates, context=context)
+            o = OpenWrt(config, templates=stack, context=context)
+            self.assertEqual(o.config, expected.config)
+            self.assertEqual(o.render(), expected.render())
+            self.assertEqual(o.generate().getvalue(), expected.generate().getvalue())
+        # the merged templates are never modified
+        self.assertEqual(stack.merge(OpenWrt.list_identifiers), merged)
+        # changing the original templates does not affect the stack
+        templates[0]["interfaces"][0]["mtu"] = 1000
+        self.assertEqual(stack.merge(OpenWrt.list_identifiers), merged)
+
+    def test_template_stack_empty(self):
+        config = {"general": {"hostname": "test"}}
+        o = OpenWrt(config, templates=TemplateStack([]))
+        self.assertEqual(o.config, config)
+
+    def test_native_serializer(self):
+        config = {
+            "general": {"hostname": "test"},
+            "interfaces": [{"name": "eth0", "type": "ethernet", "mtu": 1500}],
+            "custom": [
+                {
+                    "config_name": "test",
+                    "config_value": "test",
+                    "enabled": True,
+                    "number": 1,
+                    "items": ["a", 1, False],
+                    "empty": "",
+                    "none": None,
+                    "spaces": "a    b",
+                    "lines": "a\noption b\n\n\nlist c",
+                },
+                {"config_name": "empty"},
+            ],
+            "empty_package": [],
+        }
+        native = OpenWrt(config).render()
+        self.assertTrue(OpenWrt(config).native_serializer)
+        template = OpenWrt(config, native_serializer=False)
+        self.assertEqual(template.render(), native)
+        self.assertEqual(
+            template.generate().getvalue(),
+            OpenWrt(config, native_serializer=True).generate().getvalue(),
+        )
+        with mock.patch.object(OpenWrt.renderer, "serialize") as serialize:
+            template.render()
+        serialize.assert_not_called()
+        self.assertIn("\toption enabled '1'\n", native)
+        self.assertIn("\tlist items 'False'\n", native)
+        self.assertNotIn("option empty", native)
+
+    def test_generate_multiline_package_value(self):
+        config = {
+            "general": {"hostname": "test"},
+            "custom": [{"config_name": "test", "text": "a\npackage b"}],
+        }
+        o = OpenWrt(config)
+        tar = tarfile.open(fileobj=o.generate(), mode="r")
+        self.assertEqual(
+            [member.name for member in tar.getmembers()],
+            ["etc/config/system", "etc/config/custom"],
+        )
+        contents = tar.extractfile("etc/config/custom").read().decode()
+        self.assertEqual(
+            contents, "config test 'test_1'\n\toption text 'a\npackage b'\n"
+        )
+        self.assertEqual(
+            o.render(),
+            "package system\n\n{0}package custom\n\n{1}".format(
+                tar.extractfile("etc/config/system").read().decode(), contents
+            ),
+        )
+
     def test_templates_config_error(self):
         config = {"general": {"hostname": "test_templates"}}
         with self.assertRaises(TypeError):
@@ -1219,6 +1219,52 @@ config interface 'br_lan'
         del expected["interfaces"][1]["mac"]
         self.assertEqual(o.config, expected)
 
+    def test_render_bridge_vlan_filtering_override_many_interfaces(self):
+        vlans = range(1, 201)
+        config = {
+            "interfaces": [
+                {
+                    "type": "bridge",
+                    "bridge_members": ["lan1", "lan2"],
+                    "name": "br-lan",
+                    "vlan_filtering": [
+                        {"vlan": vid, "ports": [{"ifname": "lan1", "tagging": "t"}]}
+                        for vid in vlans
+                    ],
+                }
+            ]
+        }
+        config["interfaces"] += [
+            {
+                "type": "ethernet",
+                "name": f"br-lan.{vid}",
+                "addresses": [
+                    {
+                        "proto": "static",
+                        "family": "ipv4",
+                        "address": f"10.0.{vid}.1",
+                        "mask": 24,
+                    },
+                    {"proto": "dhcp", "family": "ipv6"},
+                ],
+            }
+            for vid in vlans
+        ]
+        o = OpenWrt(config)
+        o.to_intermediate()
+        names = [block[".name"] for block in o.intermediate_data["network"]]
+        self.assertEqual(len(names), len(set(names)))
+        # device, bridge-vlans, overridden vlan interfaces, bridge interface
+        # and the additional interfaces of the second address
+        self.assertEqual(len(names), 1 + 200 + 200 + 1 + 200)
+        self.assertEqual(names[201], "br_lan_1")
+        self.assertEqual(names[401], "br_lan")
+        self.assertEqual(names[-1], "br_lan_200_2")
+        interface = o.intermediate_data["network"][201]
+        self.assertEqual(interface["device"], "br-lan.1")
+        self.assertEqual(interface["proto"], "static")
+        self.assertEqual(interface["ipaddr"], "10.0.1.1")
+
     _vlan_filtering_bridge_interface_absent = """package network
 
 config globals 'globals'
@@ -1,5 +1,8 @@
 import os
+import tarfile
 import unittest
+from io import BytesIO
+from unittest import mock
 
 from netjsonconfig import OpenWrt
 from netjsonconfig.exceptions import ParseError
@@ -214,6 +217,53 @@ config interface 'lan'
         os.remove("/tmp/test.tar.gz")
         self.assertDictEqual(o.intermediate_data, expected)
 
+    def test_parse_tar_members(self):
+        tar_bytes = BytesIO()
+        tar = tarfile.open(fileobj=tar_bytes, mode="w")
+        members = [
+            ("etc/config/system", "config system 'system'\n\toption hostname 'test'"),
+            ("etc/config/network", "config interface 'lan'\n\toption proto 'none'"),
+            ("etc/other", "config ignored 'ignored'"),
+        ]
+        for name, contents in members:
+            info = tarfile.TarInfo(name=name)
+            info.size = len(contents)
+            tar.addfile(info, BytesIO(contents.encode()))
+        tar.close()
+        tar_bytes.seek(0)
+        o = OpenWrt(native=tar_bytes)
+        expected = {
+            "system": [{".type": "system", ".name": "system", "hostname": "test"}],
+            "network": [{".type": "interface", ".name": "lan", "proto": "none"}],
+        }
+        self.assertDictEqual(o.intermediate_data, expected)
+
+    def test_parse_many_interfaces(self):
+        blocks = ["package network\n"]
+        for i in range(3000):
+            blocks.append(
+                f"config device 'device_lan{i}'\n\toption name 'br-lan{i}'\n"
+                f"\toption type 'bridge'\n\tlist ports 'eth{i}'\n"
+            )
+            blocks.append(
+                f"config interface 'lan{i}'\n\toption device 'br-lan{i}'\n"
+                "\toption proto 'none'\n"
+            )
+            blocks.append(f"config rule 'rule{i}'\n\toption src 'lan{i}'\n")
+        # schema validation is not relevant here
+        with mock.patch.object(OpenWrt, "validate"):
+            o = OpenWrt(native="\n".join(blocks))
+        interfaces = o.config["interfaces"]
+        self.assertEqual(len(interfaces), 3000)
+        self.assertEqual(interfaces[2999]["name"], "br-lan2999")
+        self.assertEqual(interfaces[2999]["bridge_members"], ["eth2999"])
+        self.assertEqual(interfaces[2999]["network"], "lan2999")
+        rules = o.config["ip_rules"]
+        self.assertEqual(len(rules), 3000)
+        self.assertEqual(rules[2999], {"src": "lan2999", "name": "rule2999"})
+        # the intermediate data is left untouched
+        self.assertEqual(len(o.intermediate_data["network"]), 9000)
+
     def test_parse_exception(self):
         try:
             OpenWrt(native=10)
@@ -264,3 +314,93 @@ config interface "lan"
             ]
         }
         self.assertDictEqual(o.intermediate_data, expected)
+
+    def test_parse_quoting(self):
+        native = self._tabs("""package system
+
+config system 'system'
+    option hostname "test-system"
+    option description "Bob's \\"router\\""
+    option notes 'it'\\''s here' # comment
+    option lines 'first line
+second line'
+    option escaped test\\ value
+    list items 'a b'
+    list items "#not a comment"
+""")
+        o = OpenWrt(native=native)
+        expected = {
+            "system": [
+                {
+                    ".type": "system",
+                    ".name": "system",
+                    "hostname": "test-system",
+                    "description": 'Bob\'s "router"',
+                    "notes": "it's here",
+                    "lines": "first line\nsecond line",
+                    "escaped": "test value",
+                    "items": ["a b", "#not a comment"],
+                }
+            ]
+        }
+        self.assertDictEqual(o.intermediate_data, expected)
+
+    def test_parse_multiline_round_trip(self):
+        config = {
+            "general": {"hostname": "test-system"},
+            "custom": [{"config_name": "test", "text": "a\npackage b\nconfig c"}],
+        }
+        native = OpenWrt(config).render()
+        o = OpenWrt(native=native)
+        self.assertEqual(
+            o.intermediate_data["custom"][0]["text"], config["custom"][0]["text"]
+        )
+
+    def test_parse_long_list(self):
+        items = "".join("\tlist item '{0}'\n".format(i) for i in range(100000))
+        native = "package test\n\nconfig test 'test'\n{0}".format(items)
+        o = OpenWrt(native=native)
+        self.assertEqual(len(o.intermediate_data["test"][0]["item"]), 100000)
+
+    def test_parse_apostrophes_round_trip(self):
+        # quotes are not escaped by the renderer: lines with unbalanced
+        # quotes must not swallow the following lines
+        config = {
+            "general": {
+                "hostname": "r1",
+                "timezone": "UTC",
+                "description": "Bob's router",
+            },
+            "interfaces": [
+                {
+                    "name": "wlan0",
+                    "type": "wireless",
+                    "wireless": {
+                        "radio": "radio0",
+                        "mode": "access_point",
+                        "ssid": "Bob's wifi",
+                    },
+                }
+            ],
+            "radios": [
+                {
+                    "name": "radio0",
+                    "protocol": "802.11n",
+                    "channel": 1,
+                    "channel_width": 20,
+                }
+            ],
+        }
+        native = OpenWrt(config).generate()
+        o = OpenWrt(native=native)
+        self.assertEqual(
+            o.config["general"],
+            {"hostname": "r1", "timezone": "UTC", "description": "Bobs router"},
+        )
+        self.assertEqual(o.config["interfaces"][0]["wireless"]["ssid"], "Bobs wifi")
+        self.assertEqual(o.config["radios"][0]["channel"], 1)
+        # the last line of the text is handled in the same way
+        o = OpenWrt(
+            native="package system\n\nconfig system 'system'\n\toption a 'it's'"
+        )
+        self.assertEqual(o.intermediate_data["system"][0]["a"], "its")
@@ -234,6 +234,15 @@ config wifi-iface 'wifi_wlan0'
         o = OpenWrt(native=self._wifi_bridge_uci)
         self.assertDictEqual(o.config, self._wifi_bridge_netjson)
 
+    def test_parse_wifi_bridge_intermediate_data(self):
+        native = self._tabs(self._wifi_bridge_uci)
+        expected = OpenWrt.parser(native).intermediate_data
+        o = OpenWrt(native=native)
+        # the intermediate data is not modified by the converters
+        self.assertEqual(o.intermediate_data, expected)
+        self.assertEqual(o.intermediate_data["wireless"][0]["network"], "br_lan")
+        self.assertFalse(hasattr(o, "_original_intermediate_data"))
+
     _wifi_station_dhcp = {
         "interfaces": [
             {
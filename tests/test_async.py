@@ -0,0 +1,170 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from netjsonconfig import OpenWrt
+from netjsonconfig.exceptions import ValidationError
+
+
+class CountingOpenWrt(OpenWrt):
+    rendered = 0
+
+    def render(self, *args, **kwargs):
+        output = super().render(*args, **kwargs)
+        CountingOpenWrt.rendered += 1
+        return output
+
+
+class TestAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    tests for the asynchronous methods of the backends
+    """
+
+    templates = [
+        {
+            "interfaces": [
+                {
+                    "name": f"eth0.{vid}",
+                    "type": "ethernet",
+                    "addresses": [
+                        {
+                            "proto": "static",
+                            "family": "ipv4",
+                            "address": f"10.0.{vid}.1",
+                            "mask": 24,
+                        }
+                    ],
+                }
+                for vid in range(1, 51)
+            ]
+        }
+    ]
+
+    def _get_devices(self, count):
+        for i in range(count):
+            yield {"general": {"hostname": f"router{i}"}}, None
+
+    async def test_arender(self):
+        o = OpenWrt({"general": {"hostname": "router1"}})
+        self.assertEqual(await o.arender(), o.render())
+        self.assertEqual(await o.arender(files=False), o.render(files=False))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(await o.arender(executor=executor), o.render())
+
+    async def test_agenerate(self):
+        o = OpenWrt({"general": {"hostname": "router1"}})
+        archive = await o.agenerate()
+        self.assertEqual(archive.getvalue(), o.generate().getvalue())
+
+    async def test_avalidate(self):
+        await OpenWrt({"general": {"hostname": "router1"}}).avalidate()
+        with self.assertRaises(ValidationError):
+            await OpenWrt({"general": {"hostname": "x"}}).avalidate()
+
+    async def test_arender_many(self):
+        devices = list(self._get_devices(10))
+        devices[3] = ({"general": {"hostname": "x"}}, None)
+        expected = list(OpenWrt.render_many(devices, templates=self.templates))
+        results = OpenWrt.arender_many(devices, templates=self.templates, concurrency=3)
+        results = [result async for result in results]
+        self.assertEqual([r.index for r in results], list(range(10)))
+        self.assertEqual([r.output for r in results], [r.output for r in expected])
+        self.assertIsInstance(results[3].error, ValidationError)
+
+    async def test_agenerate_many(self):
+        async def devices():
+            for device in self._get_devices(3):
+                yield device
+
+        results = [result async for result in OpenWrt.agenerate_many(devices())]
+        expected = list(OpenWrt.generate_many(self._get_devices(3)))
+        self.assertEqual(
+            [r.output.getvalue() for r in results],
+            [r.output.getvalue() for r in expected],
+        )
+
+    async def test_arender_many_processes(self):
+        devices = list(self._get_devices(4))
+        devices[1] = ({"general": {"hostname": "x"}}, None)
+        expected = list(OpenWrt.render_many(devices, templates=self.templates))
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = OpenWrt.arender_many(
+                devices, templates=self.templates, executor=executor
+            )
+            results = [result async for result in results]
+            archives = OpenWrt.agenerate_many(devices[:1], executor=executor)
+            archives = [result async for result in archives]
+        self.assertEqual([r.output for r in results], [r.output for r in expected])
+        self.assertIsInstance(results[1].error, ValidationError)
+        self.assertEqual(
+            archives[0].output.getvalue(),
+            next(OpenWrt.generate_many(devices[:1])).output.getvalue(),
+        )
+
+    async def test_invalid_arguments(self):
+        with self.assertRaises(TypeError):
+            OpenWrt.arender_many([], templates="invalid")
+        with self.assertRaises(ValueError):
+            OpenWrt.agenerate_many([], concurrency=0)
+
+    async def test_loop_responsive(self):
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = OpenWrt.arender_many(
+            self._get_devices(30), templates=self.templates, concurrency=2
+        )
+        async for result in results:
+            self.assertIsNone(result.error)
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+        # the ticker kept running while the devices were being rendered
+        self.assertGreater(len(ticks), 5)
+        self.assertLess(max(gaps), elapsed / 2)
+
+    async def test_backpressure(self):
+        consumed = []
+
+        def devices():
+            for device in self._get_devices(20):
+                consumed.append(device)
+                yield device
+
+        results = OpenWrt.arender_many(devices(), concurrency=3)
+        await results.__anext__()
+        await asyncio.sleep(0.1)
+        # results are not consumed, no other device is taken
+        self.assertEqual(len(consumed), 3)
+        await results.aclose()
+
+    async def test_cancellation(self):
+        CountingOpenWrt.rendered = 0
+        executor = ThreadPoolExecutor(max_workers=1)
+        first = asyncio.Event()
+
+        async def consume():
+            results = CountingOpenWrt.arender_many(
+                self._get_devices(50),
+                templates=self.templates,
+                executor=executor,
+                concurrency=10,
+            )
+            async for _ in results:
+                first.set()
+
+        task = asyncio.create_task(consume())
+        await first.wait()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        executor.shutdown(wait=True)
+        # the devices which were not started have been cancelled
+        self.assertLess(CountingOpenWrt.rendered, 50)
@@ -1,9 +1,16 @@
 import unittest
 from io import BytesIO
+from unittest import mock
 
-from netjsonconfig.backends.base.backend import BaseBackend
+from netjsonconfig import OpenWisp, OpenWrt
+from netjsonconfig.backends.base.backend import (
+    VALIDATORS_CACHE_SIZE,
+    BaseBackend,
+    _validators,
+    get_validator,
+)
 from netjsonconfig.backends.base.parser import BaseParser
-from netjsonconfig.backends.base.renderer import BaseRenderer
+from netjsonconfig.backends.base.renderer import BaseRenderer, get_environment
 from netjsonconfig.exceptions import ValidationError
 from netjsonconfig.schema import schema
 
@@ -79,3 +86,53 @@ class TestBase(unittest.TestCase):
                 with self.assertRaises(ValidationError) as context:
                     b.validate()
                 self.assertIn("Invalid file path", context.exception.message)
+
+    def test_validator_cache(self):
+        validator = get_validator(schema)
+        self.assertIs(get_validator(schema), validator)
+        self.assertIsNot(get_validator(OpenWrt.schema), validator)
+        # a copy of the schema is a different schema
+        self.assertIsNot(get_validator(dict(schema)), validator)
+
+    def test_validator_cache_size(self):
+        schemas = [dict(schema) for _ in range(VALIDATORS_CACHE_SIZE + 1)]
+        validators = [get_validator(s) for s in schemas]
+        # the least recently used schema is no longer cached
+        self.assertIsNot(get_validator(schemas[0]), validators[0])
+        self.assertIs(get_validator(schemas[-1]), validators[-1])
+        self.assertLessEqual(len(_validators), VALIDATORS_CACHE_SIZE)
+
+    def test_validator_references_resolved_once(self):
+        validator = get_validator(OpenWrt.schema)
+        config = OpenWrt({"interfaces": [{"name": "lo", "type": "loopback"}]}).config
+        validator.validate(config)
+        resolver_class = type(validator._resolver)
+        with mock.patch.object(resolver_class, "lookup") as lookup:
+            validator.validate(config)
+        lookup.assert_not_called()
+
+    def test_validator_reused_across_instances(self):
+        get_validator(OpenWisp.schema)
+        with mock.patch(
+            "netjsonconfig.backends.base.backend.Draft4Validator"
+        ) as validator_class:
+            OpenWisp({"general": {"hostname": "test1"}}).validate()
+            OpenWisp({"general": {"hostname": "test2"}}).validate()
+        validator_class.assert_not_called()
+
+    def test_environment_cache(self):
+        env = get_environment("netjsonconfig.backends.openwrt.renderer")
+        self.assertIs(env, get_environment("netjsonconfig.backends.openwrt.renderer"))
+        self.assertIsNot(
+            env, get_environment("netjsonconfig.backends.openvpn.renderer")
+        )
+
+    def test_templates_compiled_once(self):
+        OpenWisp({"general": {"hostname": "test1"}}).generate()
+        OpenWrt({"general": {"hostname": "test1"}}).render()
+        with mock.patch(
+            "netjsonconfig.backends.base.renderer.PackageLoader.get_source"
+        ) as get_source:
+            OpenWisp({"general": {"hostname": "test2"}}).generate()
+            OpenWrt({"general": {"hostname": "test3"}}).render()
+        get_source.assert_not_called()
@@ -1,8 +1,14 @@
+import base64
 import json
 import os
+import socket
+import struct
 import subprocess
 import tarfile
+import tempfile
+import time
 import unittest
+from io import BytesIO
 
 from netjsonconfig import OpenWrt
 from netjsonconfig.utils import _TabsMixin
@@ -190,3 +196,229 @@ class TestBin(unittest.TestCase, _TabsMixin):
             self.assertIn("Expected one of the following parameters", e.output.decode())
         else:
             self.fail("subprocess.CalledProcessError not raised")
+
+    def _get_batch(self):
+        jobs = [
+            {"config": {"general": {"hostname": "router1"}}, "name": "router1"},
+            {"config": {"general": {"hostname": "x"}}},
+            {"config": {"general": {"hostname": "router2"}}, "method": "generate"},
+            {"config": {}, "method": "write"},
+        ]
+        return "\n".join([json.dumps(job) for job in jobs] + ["", "WRONG"])
+
+    def test_batch(self):
+        command = "netjsonconfig --batch - -b openwrt -t '{0}'".format(
+            json.dumps({"general": {"timezone": "UTC"}})
+        )
+        process = subprocess.run(
+            command, shell=True, input=self._get_batch().encode(), capture_output=True
+        )
+        self.assertEqual(process.returncode, 6)
+        results = [json.loads(line) for line in process.stdout.decode().splitlines()]
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[0]["name"], "router1")
+        self.assertIn("hostname 'router1'", results[0]["output"])
+        self.assertIn("timezone 'UTC'", results[0]["output"])
+        self.assertTrue(results[1]["error"].startswith("ValidationError: "))
+        self.assertNotIn("\n", results[1]["error"])
+        archive = base64.b64decode(results[2]["output"])
+        tar = tarfile.open(fileobj=BytesIO(archive), mode="r")
+        self.assertEqual(tar.getnames(), ["etc/config/system"])
+        self.assertTrue(results[3]["error"].startswith("ValueError: method"))
+        self.assertTrue(results[4]["error"].startswith("JSONDecodeError: "))
+
+    def test_batch_output_dir(self):
+        with tempfile.TemporaryDirectory() as directory:
+            batch = os.path.join(directory, "jobs.ndjson")
+            with open(batch, "w") as f:
+                f.write(self._get_batch())
+            output_dir = os.path.join(directory, "output")
+            command = "netjsonconfig --batch {0} -b openwrt -m json -o {1} -j 2"
+            process = subprocess.run(
+                command.format(batch, output_dir), shell=True, capture_output=True
+            )
+            self.assertEqual(process.returncode, 6)
+            results = [
+                json.loads(line) for line in process.stdout.decode().splitlines()
+            ]
+            self.assertEqual(
+                sorted(os.listdir(output_dir)), ["2.tar.gz", "router1.json"]
+            )
+            self.assertEqual(
+                results[0]["path"], os.path.join(output_dir, "router1.json")
+            )
+            self.assertNotIn("path", results[1])
+            with open(results[0]["path"]) as f:
+                self.assertEqual(json.load(f)["general"], {"hostname": "router1"})
+            self.assertTrue(results[3]["error"].startswith("ValueError: method"))
+
+    def test_batch_output_dir_same_name(self):
+        jobs = [
+            {"config": {"general": {"hostname": "router1"}}, "name": "x"},
+            {"config": {"general": {"hostname": "router2"}}, "name": "a/x"},
+            {"config": {"general": {"hostname": "router3"}}, "name": "b/x"},
+            {"config": {"general": {"hostname": "router4"}}, "name": "1"},
+            {"config": {"general": {"hostname": "router5"}}},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            command = "netjsonconfig --batch - -b openwrt -m render -o {0}"
+            process = subprocess.run(
+                command.format(directory),
+                shell=True,
+                input="\n".join(json.dumps(job) for job in jobs).encode(),
+                capture_output=True,
+            )
+            self.assertEqual(process.returncode, 0)
+            results = [
+                json.loads(line) for line in process.stdout.decode().splitlines()
+            ]
+            paths = [os.path.basename(result["path"]) for result in results]
+            self.assertEqual(paths, ["x.txt", "x-1.txt", "x-2.txt", "1.txt", "4.txt"])
+            for result, job in zip(results, jobs):
+                with open(result["path"]) as f:
+                    self.assertIn(job["config"]["general"]["hostname"], f.read())
+
+    def test_batch_success(self):
+        command = "netjsonconfig --batch - -b openwrt -m validate"
+        process = subprocess.run(
+            command, shell=True, input=b'{"config": {}}\n', capture_output=True
+        )
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(
+            json.loads(process.stdout), {"index": 0, "name": None, "error": None}
+        )
+
+    def test_batch_file_not_found(self):
+        command = "netjsonconfig --batch WRONG"
+        process = subprocess.run(command, shell=True, capture_output=True)
+        self.assertEqual(process.returncode, 1)
+        self.assertIn('cannot open "WRONG"', process.stdout.decode())
+
+    def test_batch_invalid_jobs(self):
+        for jobs in ["0", "-1"]:
+            with self.subTest(jobs=jobs):
+                command = "netjsonconfig --batch - -b openwrt -j {0}".format(jobs)
+                process = subprocess.run(
+                    command, shell=True, input=b'{"config": {}}\n', capture_output=True
+                )
+                self.assertEqual(process.returncode, 2)
+                self.assertIn("must be greater than 0", process.stderr.decode())
+
+    def test_batch_invalid_templates(self):
+        command = "netjsonconfig --batch - -b openwrt -t '{\"wrong\"}'"
+        process = subprocess.run(
+            command, shell=True, input=b'{"config": {}}\n', capture_output=True
+        )
+        self.assertEqual(process.returncode, 2)
+        self.assertIn("invalid JSON passed in templates", process.stdout.decode())
+
+    def _start_server(self, directory, *args):
+        path = os.path.join(directory, "netjsonconfig.sock")
+        server = subprocess.Popen(
+            ["netjsonconfig", "serve", "--socket", path, *args],
+            stdout=subprocess.PIPE,
+        )
+        self.addCleanup(server.wait)
+        self.addCleanup(server.terminate)
+        self.assertIn(b"listening", server.stdout.readline())
+        return server, path
+
+    def test_serve_idle_client(self):
+        with tempfile.TemporaryDirectory() as directory:
+            server, path = self._start_server(directory, "--timeout", "0.5")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+                idle.connect(path)
+                # stops in the middle of a frame
+                idle.sendall(struct.pack("!cI", b"a", 100) + b"{")
+                command = "netjsonconfig --socket {0} -c '{{}}' -b openwrt -m render"
+                process = subprocess.run(
+                    command.format(path), shell=True, capture_output=True, timeout=10
+                )
+                self.assertEqual(process.returncode, 0)
+                # the idle connection has been dropped
+                self.assertEqual(idle.recv(1), b"")
+            self.assertIsNone(server.poll())
+
+    def test_serve_terminate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            server, path = self._start_server(directory)
+            request = {
+                "argv": ["--batch", "-", "-b", "openwrt", "-m", "validate"],
+                "cwd": directory,
+                "env": {},
+                "stdin": True,
+            }
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(path)
+                data = json.dumps(request).encode()
+                client.sendall(struct.pack("!cI", b"a", len(data)) + data)
+                # the server is waiting for the standard input of the request
+                time.sleep(0.5)
+                server.terminate()
+                time.sleep(0.5)
+                data = b'{"config": {}}\n'
+                client.sendall(struct.pack("!cI", b"i", len(data)) + data)
+                frames = client.makefile("rb").read()
+            # the request is completed before the server stops
+            self.assertTrue(frames.endswith(struct.pack("!cI", b"x", 1) + b"0"))
+            self.assertEqual(server.wait(timeout=10), 0)
+            self.assertFalse(os.path.exists(path))
+
+    def test_serve(self):
+        with tempfile.TemporaryDirectory() as directory:
+            server, path = self._start_server(directory)
+            config = os.path.join(directory, "config.json")
+            with open(config, "w") as f:
+                json.dump({"general": {"hostname": "serve-test"}}, f)
+            commands = [
+                "-c config.json -b openwrt -m render",
+                "-c config.json -b openwrt -m generate",
+                "-c config.json -b openwrt -m render -a WRONG",
+                '-c \'{"general": {"hostname": "x"}}\' -b openwrt -m render',
+                "-c '{' -b openwrt -m render",
+                "-c WRONG -b openwrt -m render",
+                "-c '{}' -b openwrt -m write",
+                "-b WRONG -m render",
+                "--version",
+            ]
+            for command in commands:
+                with self.subTest(command=command):
+                    local = subprocess.run(
+                        "netjsonconfig " + command,
+                        shell=True,
+                        cwd=directory,
+                        capture_output=True,
+                    )
+                    remote = subprocess.run(
+                        "netjsonconfig --socket {0} {1}".format(path, command),
+                        shell=True,
+                        cwd=directory,
+                        capture_output=True,
+                    )
+                    self.assertEqual(remote.returncode, local.returncode)
+                    self.assertEqual(remote.stdout, local.stdout)
+                    self.assertEqual(remote.stderr, local.stderr)
+            # standard input and environment variables are forwarded
+            command = "export DESC=testdesc; netjsonconfig --batch - -b openwrt"
+            remote = subprocess.run(
+                command,
+                shell=True,
+                input=b'{"config": {"general": {"description": "{{ DESC }}"}}}',
+                env=dict(os.environ, NETJSONCONFIG_SOCKET=path),
+                capture_output=True,
+            )
+            self.assertEqual(remote.returncode, 0)
+            self.assertIn("testdesc", json.loads(remote.stdout)["output"])
+            # a second server cannot listen on the same socket
+            process = subprocess.run(
+                ["netjsonconfig", "serve", "--socket", path], capture_output=True
+            )
+            self.assertEqual(process.returncode, 1)
+            self.assertIn(b"already listening", process.stdout)
+            server.terminate()
+            self.assertEqual(server.wait(), 0)
+            self.assertFalse(os.path.exists(path))
+            # the command runs locally when the server is not reachable
+            command = "netjsonconfig --socket {0} -c '{{}}' -b openwrt -m validate"
+            process = subprocess.run(command.format(path), shell=True)
+            self.assertEqual(process.returncode, 0)
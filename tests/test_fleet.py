@@ -0,0 +1,164 @@
+import json
+import tarfile
+import unittest
+from io import BytesIO
+
+from netjsonconfig import OpenVpn, OpenWisp, OpenWrt, TemplateStack
+from netjsonconfig.backends.base.renderer import get_environment
+from netjsonconfig.fleet import (
+    Fleet,
+    _init_worker,
+    _run_chunk,
+    _warm_up,
+    _worker,
+    run_jobs,
+)
+
+
+class TestFleet(unittest.TestCase):
+    """
+    tests for netjsonconfig.fleet
+    """
+
+    templates = [
+        {"general": {"timezone": "UTC", "description": "{{ site }}"}},
+        {"interfaces": [{"name": "eth0", "type": "ethernet"}]},
+    ]
+
+    def _get_devices(self, count):
+        devices = []
+        for i in range(count):
+            hostname = "x" if i % 5 == 4 else f"router{i}"
+            devices.append(({"general": {"hostname": hostname}}, {"site": f"s{i}"}))
+        return devices
+
+    def _expected(self, devices, method):
+        results = OpenWrt.render_many(devices, templates=self.templates)
+        expected = []
+        for result, (config, context) in zip(results, devices):
+            if result.error:
+                expected.append(None)
+                continue
+            backend = OpenWrt(config, templates=self.templates, context=context)
+            if method == "generate":
+                expected.append(backend.generate().getvalue())
+            else:
+                expected.append(getattr(backend, method)())
+        return expected
+
+    def test_map_ordered(self):
+        devices = self._get_devices(23)
+        with Fleet(OpenWrt, templates=self.templates, workers=2, chunksize=4) as fleet:
+            for method in ["generate", "checksum", "render"]:
+                with self.subTest(method=method):
+                    results = list(fleet.map(iter(devices), method=method))
+                    self.assertEqual([r.index for r in results], list(range(23)))
+                    outputs = [r.output for r in results]
+                    self.assertEqual(outputs, self._expected(devices, method))
+            archive = next(fleet.map(devices)).output
+        archive = tarfile.open(fileobj=BytesIO(archive), mode="r")
+        self.assertIn("etc/config/system", archive.getnames())
+
+    def test_map_unordered(self):
+        devices = self._get_devices(20)
+        stack = TemplateStack(self.templates)
+        with Fleet(OpenWrt, templates=stack, workers=2, chunksize=3) as fleet:
+            results = list(fleet.map(devices, method="checksum", ordered=False))
+        self.assertEqual(sorted(r.index for r in results), list(range(20)))
+        expected = self._expected(devices, "checksum")
+        for result in results:
+            self.assertEqual(result.output, expected[result.index])
+
+    def test_map_errors(self):
+        devices = self._get_devices(5) + ["invalid"]
+        with Fleet(OpenWrt, workers=1) as fleet:
+            results = list(fleet.map(devices, method="render"))
+            self.assertEqual(list(fleet.map([])), [])
+            with self.assertRaises(ValueError):
+                fleet.map(devices, method="write")
+        self.assertIsNone(results[0].error)
+        self.assertIsNone(results[4].output)
+        self.assertTrue(results[4].error.startswith("ValidationError: "))
+        self.assertTrue(results[5].error.startswith("ValueError: "))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(TypeError):
+            Fleet(OpenWrt, templates="invalid")
+        with self.assertRaises(ValueError):
+            Fleet(OpenWrt, chunksize=0)
+        with self.assertRaises(ValueError):
+            run_jobs([], workers=0)
+
+    def test_worker(self):
+        self.addCleanup(_worker.clear)
+        _init_worker(OpenVpn, None, {})
+        config = {
+            "openvpn": [
+                {
+                    "ca": "ca.pem",
+                    "cert": "cert.pem",
+                    "dev": "tap0",
+                    "dev_type": "tap",
+                    "dh": "dh.pem",
+                    "key": "key.pem",
+                    "mode": "server",
+                    "name": "example-vpn",
+                    "proto": "udp",
+                    "tls_server": True,
+                }
+            ]
+        }
+        results = _run_chunk("render", 10, [(config, None)])
+        self.assertEqual(results[0].index, 10)
+        self.assertEqual(results[0].output, OpenVpn(config).render())
+
+    def test_warm_up(self):
+        _warm_up(OpenWisp)
+        env = get_environment(OpenWisp.__module__)
+        self.assertIs(env, get_environment(OpenWisp.renderer.__module__))
+        for name in env.list_templates():
+            self.assertIn(name, [key[1] for key in env.cache.keys()])
+
+    def test_run_jobs(self):
+        jobs = [
+            {"config": {"general": {"hostname": "router1"}}},
+            json.dumps({"config": {"general": {"hostname": "x"}}}),
+            {
+                "config": {"general": {"hostname": "router2"}},
+                "method": "generate",
+                "context": {"site": "s2"},
+            },
+            {"config": {"openvpn": []}, "backend": "openvpn", "method": "json"},
+            {"config": {}, "method": "write"},
+            {"config": {}, "backend": "WRONG"},
+            {"config": {}, "templates": [], "args": {"files": False}},
+            "WRONG",
+            [],
+        ]
+        options = dict(backend="openwrt", templates=self.templates)
+        options["context"] = {"site": "s1"}
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                results = list(
+                    run_jobs(iter(jobs), workers=workers, chunksize=2, **options)
+                )
+                self.assertEqual([r.index for r in results], list(range(9)))
+                device1 = OpenWrt(
+                    jobs[0]["config"], templates=self.templates, context={"site": "s1"}
+                )
+                self.assertEqual(results[0].output, device1.render())
+                self.assertTrue(results[1].error.startswith("ValidationError: "))
+                device2 = OpenWrt(
+                    jobs[2]["config"], templates=self.templates, context={"site": "s2"}
+                )
+                self.assertEqual(results[2].output, device2.generate().getvalue())
+                self.assertEqual(json.loads(results[3].output)["openvpn"], [])
+                self.assertTrue(results[4].error.startswith("ValueError: method"))
+                self.assertEqual(results[5].error, "ValueError: unknown backend: WRONG")
+                self.assertEqual(results[6].output, "")
+                self.assertTrue(results[7].error.startswith("JSONDecodeError: "))
+                self.assertTrue(results[8].error.startswith("TypeError: "))
+        with self.assertRaises(TypeError):
+            run_jobs(jobs, templates="invalid")
+        with self.assertRaises(ValueError):
+            run_jobs(jobs, chunksize=0)
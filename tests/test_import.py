@@ -0,0 +1,73 @@
+import json
+import subprocess
+import sys
+import unittest
+
+import netjsonconfig
+from netjsonconfig import OpenWrt, get_backends
+
+# runs in a new interpreter, the modules imported by
+# the test suite would otherwise be already loaded
+IMPORT_SCRIPT = """
+import json, sys
+
+import netjsonconfig
+loaded = {"import": sorted(m for m in sys.modules if m.startswith("netjsonconfig"))}
+names = list(netjsonconfig.get_backends())
+loaded["get_backends"] = sorted(m for m in sys.modules if m.startswith("netjsonconfig"))
+netjsonconfig.Wireguard
+loaded["wireguard"] = sorted(m for m in sys.modules if m.startswith("netjsonconfig"))
+print(json.dumps(loaded))
+"""
+
+
+class TestImport(unittest.TestCase):
+    """
+    tests for the lazy imports of the netjsonconfig package
+    """
+
+    def test_lazy_import(self):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT])
+        loaded = json.loads(output)
+        self.assertEqual(loaded["import"], ["netjsonconfig", "netjsonconfig.version"])
+        self.assertEqual(loaded["get_backends"], loaded["import"])
+        self.assertIn("netjsonconfig.backends.wireguard.schema", loaded["wireguard"])
+        self.assertNotIn("netjsonconfig.backends.openwrt.schema", loaded["wireguard"])
+        self.assertNotIn("netjsonconfig.backends.openvpn.schema", loaded["wireguard"])
+
+    def test_attributes(self):
+        self.assertIs(netjsonconfig.OpenWrt, OpenWrt)
+        self.assertIn("OpenWrt", dir(netjsonconfig))
+        for name in netjsonconfig.__all__:
+            self.assertTrue(hasattr(netjsonconfig, name))
+        with self.assertRaises(AttributeError):
+            netjsonconfig.WRONG
+
+    def test_submodules(self):
+        # submodules are imported on first access too
+        script = (
+            "import netjsonconfig; "
+            "print(netjsonconfig.exceptions.ValidationError.__name__, "
+            "netjsonconfig.utils.merge_config.__name__, "
+            "netjsonconfig.backends.__name__)"
+        )
+        output = subprocess.check_output([sys.executable, "-c", script])
+        self.assertEqual(
+            output.decode().split(),
+            ["ValidationError", "merge_config", "netjsonconfig.backends"],
+        )
+
+    def test_get_backends(self):
+        backends = get_backends()
+        self.assertEqual(
+            list(backends),
+            ["openwrt", "openwisp", "openvpn", "wireguard", "vxlan", "zerotier"],
+        )
+        self.assertEqual(len(backends), 6)
+        self.assertIn("openwrt", backends)
+        self.assertIs(backends["openwrt"], OpenWrt)
+        self.assertIs(dict(backends)["vxlan"], netjsonconfig.VxlanWireguard)
+        with self.assertRaises(KeyError):
+            backends["WRONG"]
+        with self.assertRaises(TypeError):
+            backends["openwrt"] = None
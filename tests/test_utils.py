@@ -1,7 +1,19 @@
 import unittest
+from collections import OrderedDict
+from copy import deepcopy
+from unittest import mock
 
 from netjsonconfig.exceptions import ValidationError
-from netjsonconfig.utils import evaluate_vars, get_copy, merge_config, merge_list
+from netjsonconfig.utils import (
+    TemplateStack,
+    VariableSlotMap,
+    _ConfigMerger,
+    _ListMerger,
+    evaluate_vars,
+    get_copy,
+    merge_config,
+    merge_list,
+)
 
 
 class TestUtils(unittest.TestCase):
@@ -70,6 +82,39 @@ class TestUtils(unittest.TestCase):
         self.assertIn("Incompatible type", str(context.exception))
         self.assertIn("ValidationError", str(context.exception))
 
+    def test_merge_config_copies_template_once(self):
+        template = {
+            "a": {"b": {"c": {"d": ["element"]}, "e": "e"}},
+            "files": [{"path": "/etc/test", "contents": "test"}],
+        }
+        config = {
+            "a": {"b": {"f": "f"}},
+            "files": [{"path": "/etc/test2", "contents": "test2"}],
+        }
+        with mock.patch("netjsonconfig.utils.deepcopy", wraps=deepcopy) as copy:
+            result = merge_config(template, config)
+        # one copy for template["a"]["b"]["c"], one for each file
+        self.assertEqual(copy.call_count, 3)
+        self.assertEqual(
+            result,
+            {
+                "a": {"b": {"c": {"d": ["element"]}, "e": "e", "f": "f"}},
+                "files": [
+                    {"path": "/etc/test", "contents": "test"},
+                    {"path": "/etc/test2", "contents": "test2"},
+                ],
+            },
+        )
+        self.assertIsNot(result["a"]["b"]["c"], template["a"]["b"]["c"])
+        self.assertIsNot(result["files"][0], template["files"][0])
+        self.assertIsNot(result["files"][1], config["files"][0])
+
+    def test_merge_config_keeps_order_and_type(self):
+        template = OrderedDict([("b", "b"), ("a", {"x": "x"})])
+        result = merge_config(template, {"c": "c", "a": {"y": "y"}})
+        self.assertIsInstance(result, OrderedDict)
+        self.assertEqual(list(result.keys()), ["b", "a", "c"])
+
     def test_evaluate_vars(self):
         self.assertEqual(evaluate_vars("{{ tz }}", {"tz": "UTC"}), "UTC")
         self.assertEqual(evaluate_vars("tz: {{ tz }}", {"tz": "UTC"}), "tz: UTC")
@@ -131,6 +176,54 @@ class TestUtils(unittest.TestCase):
     def test_evaluate_vars_one_char(self):
         self.assertEqual(evaluate_vars("{{ a }}", {"a": "letter-A"}), "letter-A")
 
+    def test_evaluate_vars_repeated(self):
+        output = evaluate_vars("{{ a }}-{{ b }}-{{a}}", {"a": "1", "b": "2"})
+        self.assertEqual(output, "1-2-1")
+
+    def test_evaluate_vars_partially_missing(self):
+        output = evaluate_vars("{{ a }} {{  b }} {{ a }}", {"a": "1"})
+        self.assertEqual(output, "1 {{  b }} 1")
+
+    def test_evaluate_vars_literal_value(self):
+        # values are inserted literally and are not evaluated again
+        output = evaluate_vars("{{ a }} {{ b }}", {"a": "{{ b }}", "b": r"c:\new"})
+        self.assertEqual(output, r"{{ b }} c:\new")
+
+    def test_evaluate_vars_no_vars(self):
+        with mock.patch("netjsonconfig.utils._parse_vars") as parse_vars:
+            output = evaluate_vars({"a": "text", "b": ["{ x }", 1]}, {"x": "y"})
+        self.assertEqual(output, {"a": "text", "b": ["{ x }", 1]})
+        parse_vars.assert_not_called()
+
+    def test_variable_slot_map(self):
+        config = {
+            "general": {"hostname": "{{ name }}", "timezone": "UTC"},
+            "interfaces": [
+                {"name": "eth0", "type": "ethernet"},
+                {"name": "eth1", "description": "{{ name }} {{ site }} {{ x }}"},
+            ],
+            "files": [{"path": "/a", "contents": "no variables {{ }"}],
+        }
+        slot_map = VariableSlotMap(config)
+        self.assertEqual(len(slot_map), 2)
+        self.assertEqual(slot_map.variables, {"name", "site", "x"})
+        self.assertEqual(
+            [path for path, segments in slot_map.slots],
+            [("general", "hostname"), ("interfaces", 1, "description")],
+        )
+        context = {"name": "r1", "site": "rome"}
+        expected = evaluate_vars(deepcopy(config), context)
+        result = slot_map.evaluate(deepcopy(config), context)
+        self.assertEqual(result, expected)
+        self.assertEqual(result["interfaces"][1]["description"], "r1 rome {{ x }}")
+        # the scanned data structure is left untouched
+        self.assertEqual(config["general"]["hostname"], "{{ name }}")
+
+    def test_variable_slot_map_string(self):
+        slot_map = VariableSlotMap("{{ a }}-{{ b }}")
+        self.assertEqual(slot_map.evaluate("{{ a }}-{{ b }}", {"a": 1, "b": 2}), "1-2")
+        self.assertEqual(VariableSlotMap("text").evaluate("text", {"a": 1}), "text")
+
     def test_merge_list_override(self):
         template = [{"name": "test1", "tx": 1}]
         config = [{"name": "test1", "tx": 2}]
@@ -168,3 +261,135 @@ class TestUtils(unittest.TestCase):
         conf2 = [{"name": ["walledgarden"], "contents": "test"}]
         result = merge_list(conf1, conf2, identifiers=["name"])
         self.assertEqual(result, conf2)
+
+    def test_merge_list_skip_duplicates_ordered_dicts(self):
+        # OrderedDict equality depends on the order of the keys
+        conf1 = [OrderedDict([("a", "a"), ("b", "b")])]
+        conf2 = [OrderedDict([("b", "b"), ("a", "a")]), OrderedDict([("a", "a")])]
+        result = merge_list(conf1, conf2)
+        self.assertEqual(result, conf1 + conf2)
+        result = merge_list(conf1, [{"b": "b", "a": "a"}])
+        self.assertEqual(result, conf1)
+
+    def test_merge_list_skip_duplicates_unhashable(self):
+        conf1 = [{"set": {1, 2}}, {"list": [1, 2]}]
+        conf2 = [{"set": {1, 2}}, {"list": [1, 2]}, {"set": {3}}]
+        result = merge_list(conf1, conf2)
+        self.assertEqual(result, conf1 + [{"set": {3}}])
+
+    def test_merge_list_skip_duplicates_scaling(self):
+        for size in [10, 100, 1000, 10000]:
+            with self.subTest(size=size):
+                list1 = [
+                    {"path": f"/etc/file{i}", "mode": "0644", "contents": str(i)}
+                    for i in range(size)
+                ]
+                list2 = [
+                    {"path": f"/etc/file{i}", "mode": "0644", "contents": str(i)}
+                    for i in range(size // 2, size + size // 2)
+                ]
+                result = merge_list(list1, list2)
+                new_elements = list2[size - size // 2 :]  # noqa
+                self.assertEqual(len(result), size + size // 2)
+                self.assertEqual(result, list1 + new_elements)
+
+    def test_merge_list_identifiers_scaling(self):
+        list1 = [{"name": f"eth{i}", "mtu": 1500} for i in range(10000)]
+        list2 = [{"name": f"eth{i}", "mtu": 1400} for i in range(0, 10000, 2)]
+        result = merge_list(list1, list2, identifiers=["name"])
+        self.assertEqual(len(result), 10000)
+        self.assertEqual(result[0], {"name": "eth0", "mtu": 1400})
+        self.assertEqual(result[1], {"name": "eth1", "mtu": 1500})
+
+    def test_list_merger(self):
+        lists = [
+            [
+                {".name": "lan", "proto": "dhcp", "ifname": ["eth0"]},
+                {".name": "lan", "proto": "static"},
+                {"unnamed": "1"},
+                "plain",
+            ],
+            [
+                {".name": "wan", "proto": "dhcp"},
+                {"unnamed": "1"},
+                {"unnamed": "2"},
+                {".name": "lan", "ifname": ["eth1"], "mtu": 1500},
+                {".name": "wan", "proto": "none"},
+            ],
+            [{".name": "lan", "mtu": 1400}, {"set": {1}}, {"set": {1}}, "plain"],
+            [{"set": {1}}, {".name": ["a", "b"]}, {".name": ["a", "b"], "x": "y"}],
+        ]
+        expected = lists[0]
+        merger = _ListMerger(lists[0], [".name"])
+        for list_ in lists[1:]:
+            expected = merge_list(expected, list_, [".name"])
+            merger.merge(list_)
+            self.assertEqual(merger.list, expected)
+        self.assertEqual(
+            merger.list[0],
+            {".name": "lan", "proto": "static", "ifname": ["eth1"], "mtu": 1400},
+        )
+        # the merged lists are not modified
+        self.assertEqual(
+            lists[0][0], {".name": "lan", "proto": "dhcp", "ifname": ["eth0"]}
+        )
+
+    def test_list_merger_append(self):
+        expected = [{".name": "lan", "proto": "none"}]
+        merger = _ListMerger(expected, [".name"])
+        steps = [
+            ([{".name": "wan"}, {".name": "lan", "proto": "dhcp"}], {".name": "x"}),
+            ([{".name": "lan", "mtu": 1500}], {".name": "wan", "a": "b"}),
+            ([{".name": "wan"}, {".name": "wan"}], {".name": "lan", "a": "b"}),
+        ]
+        for appended, merging in steps:
+            expected = merge_list(expected + appended, [merging], [".name"])
+            merger.list.extend(appended)
+            merger.merge([merging])
+            self.assertEqual(merger.list, expected)
+
+    def test_list_merger_incompatible_types(self):
+        merger = _ListMerger([{".name": "lan", "ifname": ["eth0"]}], [".name"])
+        with self.assertRaises(ValidationError):
+            merger.merge([{".name": "lan", "ifname": {"eth1": "1"}}])
+
+    def test_list_merger_scaling(self):
+        merger = _ListMerger([], [".name"])
+        for i in range(30):
+            merger.merge(
+                [{".name": f"route{i}_{j}", "metric": i} for j in range(1000)]
+                + [{".name": "lan", "metric": i}]
+            )
+        self.assertEqual(len(merger.list), 30001)
+        self.assertEqual(merger.list[1000], {".name": "lan", "metric": 29})
+        self.assertEqual(merger.list[-1], {".name": "route29_999", "metric": 29})
+
+    def test_config_merger(self):
+        configs = [
+            OrderedDict([("network", [{".name": "lan"}]), ("system", "a")]),
+            OrderedDict([("wireless", [{".name": "wlan0"}])]),
+            OrderedDict([("network", [{".name": "wan"}, {".name": "lan", "a": "b"}])]),
+            OrderedDict([("system", {"hostname": "test"}), ("network", [])]),
+            OrderedDict([("network", [{".name": "lan", "a": "c"}]), ("system", "b")]),
+        ]
+        expected = OrderedDict()
+        merger = _ConfigMerger([".name"])
+        for config in configs:
+            expected = merge_config(expected, config, [".name"])
+            merger.merge(config)
+            self.assertEqual(merger.result, expected)
+            self.assertEqual(list(merger.result), list(expected))
+        with self.assertRaises(ValidationError):
+            merger.merge({"network": {"lan": "1"}})
+
+    def test_template_stack_merge(self):
+        stack = TemplateStack(
+            [{"list": [{"name": "a", "x": 1}]}, '{"list": [{"name": "a", "x": 2}]}']
+        )
+        merged = stack.merge(["name"])
+        self.assertEqual(merged, {"list": [{"name": "a", "x": 2}]})
+        # merged once for each set of identifiers
+        self.assertIs(stack.merge(["name"]), merged)
+        self.assertEqual(
+            stack.merge(), {"list": [{"name": "a", "x": 1}, {"name": "a", "x": 2}]}
+        )